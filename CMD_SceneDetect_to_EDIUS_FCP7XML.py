@@ -1,334 +1,693 @@
+import contextlib
 import csv
+import glob
 import json
 import os
+import re
+import signal
+import sqlite3
 import subprocess
+import sys
+import time
 import argparse
-import xml.etree.ElementTree as ET
-from xml.dom.minidom import parseString
 
-def check_ffmpeg_ffprobe():
-    """Check if ffmpeg and ffprobe are installed."""
+# The detection, clip list, XML and probe code is shared with the GUIs in the edius_core package.
+# asyncio, concurrent.futures and the profilers are imported by the functions that use them,
+# so the command line starts quickly when it is run thousands of times from scripts.
+from edius_core.clips import SceneCsvClips, convert_csv_to_json
+from edius_core.detection import (DEFAULT_MIN_SCENE_LEN, DEFAULT_THRESHOLD, detect_scenes_all, load_frame_scores, parse_user_commands,
+                                  pyscenedetect_command, refine_cuts, run_pyscenedetect, scenes_from_scores, timecode_to_frames)
+from edius_core.fcp7xml import DETECTOR_LAYOUTS, convert_clips_to_xml, convert_json_to_xml, convert_jsons_to_xml
+from edius_core.images import save_scene_images
+from edius_core.split import SPLIT_MODES, split_video
+from edius_core.probe import (PROBE_CACHE_NAME, check_ffmpeg_ffprobe, check_ffmpeg_ffprobe_async, extract_video_info, find_tool, run_tool_async,
+                              probe_video_async, video_info_from_probe)
+
+# Extensions picked up when scanning an --input_dir for a batch run
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".mxf", ".mts", ".m2ts")
+
+# Job table of the --watch mode, kept in the watched directory
+WATCH_DB_NAME = "scenedetect_jobs.sqlite3"
+
+def _io_counters():
+    # rchar/wchar count every read()/write(), so files on a NAS are included; on Linux the
+    # counts also cover child processes (ffprobe, scenedetect) once they have been waited for
     try:
-        subprocess.run(["ffmpeg", "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        subprocess.run(["ffprobe", "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
-
-def run_pyscenedetect(video_file, output_dir, user_commands):
-    """Run PySceneDetect with the provided commands."""
-    command = ["scenedetect", "-i", video_file, "-o", output_dir] + user_commands + ["detect-content", "list-scenes"]
-    print("Running command:", " ".join(command))
+        with open("/proc/self/io") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        pass
     try:
-        subprocess.run(command, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running PySceneDetect: {e}")
-        exit(1)
+        import psutil
+        counters = psutil.Process().io_counters()
+        return counters.read_bytes, counters.write_bytes
+    except Exception:
+        return None
+
+class StageProfiler:
+    """Records wall, CPU and subprocess time and bytes read/written for each pipeline stage."""
+
+    def __init__(self, python_profile=False):
+        self.stages = []
+        self.python_profile = None
+        if python_profile:
+            import cProfile
+            self.python_profile = cProfile.Profile()
+
+    @contextlib.contextmanager
+    def stage(self, name, python=True):
+        # python=False for stages that only wait on a subprocess, which cProfile cannot see into
+        start_wall, start_cpu, start_times, start_io = time.perf_counter(), time.process_time(), os.times(), _io_counters()
+        if python and self.python_profile:
+            self.python_profile.enable()
+        try:
+            yield
+        finally:
+            if python and self.python_profile:
+                self.python_profile.disable()
+            end_times, end_io = os.times(), _io_counters()
+            # Child process times are not reported on Windows and stay 0 there
+            subprocess_time = (end_times.children_user + end_times.children_system) - (start_times.children_user + start_times.children_system)
+            self.stages.append({
+                "stage": name,
+                "wall_s": round(time.perf_counter() - start_wall, 6),
+                "cpu_s": round(time.process_time() - start_cpu, 6),
+                "subprocess_s": round(subprocess_time, 6),
+                "read_bytes": end_io[0] - start_io[0] if start_io and end_io else None,
+                "write_bytes": end_io[1] - start_io[1] if start_io and end_io else None,
+            })
+
+    def write(self, json_file, **info):
+        """Write the stage table (and the cProfile dump, if enabled) next to the other output files."""
+        data = dict(info)
+        data["stages"] = self.stages
+        data["total_wall_s"] = round(sum(stage["wall_s"] for stage in self.stages), 6)
+        if self.python_profile:
+            import pstats
+
+            pstats_file = os.path.splitext(json_file)[0] + ".pstats"
+            self.python_profile.dump_stats(pstats_file)
+            data["cprofile"] = os.path.basename(pstats_file)
+            # The 25 functions with the highest cumulative time; open the .pstats file for the rest
+            stats = pstats.Stats(self.python_profile).stats
+            top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:25]
+            data["cprofile_top"] = [
+                {"function": f"{os.path.basename(file)}:{line}({function})", "calls": calls, "tottime_s": round(tottime, 6), "cumtime_s": round(cumtime, 6)}
+                for (file, line, function), (_, calls, tottime, cumtime, _) in top
+            ]
+        with open(json_file, 'w') as file:
+            json.dump(data, file, indent=4)
+        print(f"Profile written to {json_file}")
+
+def write_scene_files(video_file, output_dir, video_info, clips=None, probe_cache=True, clip_format="json", no_json=False, profiler=None,
+                      detector_clips=None, detector_layout="tracks"):
+    """Write the JSON and XML files for detected clips, or for the scenedetect CSV when clips is None. Returns the XML path.
+
+    detector_clips are the scenes of the other detectors, put in the XML as detector_layout says.
+    """
+    profiler = profiler or StageProfiler()
+    if no_json:
+        base_name = os.path.splitext(os.path.basename(video_file))[0]
+        xml_file = os.path.join(output_dir, f"{base_name}-Scenes.xml")
+        if clips is None:
+            clips = SceneCsvClips(os.path.join(output_dir, f"{base_name}-Scenes.csv"))
+        with profiler.stage("convert_clips_to_xml"):
+            convert_clips_to_xml(video_info, clips, xml_file, detector_clips, detector_layout)
+    else:
+        with profiler.stage("convert_csv_to_json"):
+            json_file = convert_csv_to_json(video_file, output_dir, probe_cache, clips, video_info=video_info, clip_format=clip_format, detector_clips=detector_clips)
+        xml_file = os.path.splitext(json_file)[0] + ".xml"
+        with profiler.stage("convert_json_to_xml"):
+            convert_json_to_xml(json_file, xml_file, detector_layout)
+    return xml_file
+
+def _scene_clips(video_file, output_dir, clips):
+    # The detected clips, or the rows of scenedetect's CSV when the cli engine ran
+    if clips is None:
+        base_name = os.path.splitext(os.path.basename(video_file))[0]
+        clips = SceneCsvClips(os.path.join(output_dir, f"{base_name}-Scenes.csv"))
+    return clips
+
+def write_scene_images(video_file, output_dir, clips=None, contact_sheet=False, image_width=None):
+    """Save the first and last frame of every clip, or of every scenedetect CSV row when clips is None, in one ffmpeg pass."""
+    return save_scene_images(video_file, _scene_clips(video_file, output_dir, clips), output_dir, width=image_width, contact_sheet=contact_sheet)
+
+def write_scene_videos(video_file, output_dir, clips=None, mode="copy", workers=None, probe_cache=True):
+    """Export every clip, or every scenedetect CSV row when clips is None, to a video file of its own (see split_video)."""
+    return split_video(video_file, _scene_clips(video_file, output_dir, clips), output_dir, mode, workers, cache_dir=output_dir if probe_cache else None)
+
+def process_video(video_file, output_dir, user_commands, probe_cache=True, engine="cli", score_cache=True, chunks=1, profile=False, profile_python=False, clip_format="json",
+                  no_json=False, clip_source=None, detector_layout="tracks", save_images=False, contact_sheet=False, image_width=None,
+                  split_mode=None, split_workers=None):
+    """Detect scenes in one video and write its CSV, JSON and XML files. Returns the XML path.
+
+    With profile, per-stage timings are written to <name>-Profile.json, and with profile_python
+    a cProfile dump of the Python stages to <name>-Profile.pstats. With no_json the XML is
+    streamed from the detected scenes or the CSV rows and no JSON file is written. clip_source
+    picks the detector whose scenes are the clips (see detect_scenes_api); the scenes of any
+    other detectors go in the same sequence as detector_layout says. With save_images the first
+    and last frame of every scene are saved as images (see write_scene_images), plus contact
+    sheets with contact_sheet. With split_mode ("copy" or "encode") every scene is also
+    exported to a video file, split_workers at a time.
+    """
+    if not os.path.exists(video_file):
+        raise FileNotFoundError(f"Video file '{video_file}' does not exist.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    profile = profile or profile_python
+    profiler = StageProfiler(profile_python)
+    try:
+        if profile:
+            # main() has already looked the tools up; search PATH again so the stage shows the real cost
+            find_tool.cache_clear()
+            with profiler.stage("check_ffmpeg_ffprobe"):
+                check_ffmpeg_ffprobe()
+
+        with profiler.stage("extract_video_info", python=False):
+            video_info = extract_video_info(video_file, output_dir if probe_cache else None)
+
+        if engine in ("api", "numpy", "keyframes"):
+            with profiler.stage(f"detect_scenes_{engine}"):
+                clips, detector_clips = detect_scenes_all(video_file, user_commands, output_dir if score_cache else None, chunks, engine, clip_source)
+        else:
+            with profiler.stage("run_pyscenedetect", python=False):
+                run_pyscenedetect(video_file, output_dir, user_commands)
+            clips, detector_clips = None, None
+
+        xml_file = write_scene_files(video_file, output_dir, video_info, clips, probe_cache, clip_format, no_json, profiler, detector_clips, detector_layout)
+
+        if save_images:
+            with profiler.stage("save_scene_images", python=False):
+                write_scene_images(video_file, output_dir, clips, contact_sheet, image_width)
+        if split_mode:
+            with profiler.stage(f"split_video_{split_mode}", python=False):
+                write_scene_videos(video_file, output_dir, clips, split_mode, split_workers, probe_cache)
+    finally:
+        # Also written when a stage fails, to show how far the job got
+        if profile:
+            base_name = os.path.splitext(os.path.basename(video_file))[0]
+            profiler.write(os.path.join(output_dir, f"{base_name}-Profile.json"), video_file=os.path.abspath(video_file), engine=engine)
+    return xml_file
+
+def run_sweep(video_file, output_dir, user_commands, thresholds, min_scene_lens, probe_cache=True, score_cache=True, chunks=1, engine="api", clip_format="json", no_json=False):
+    """Decode a video once and write a JSON/XML pair for every threshold and min-scene-len combination.
+
+    Returns (threshold, min_scene_len, scene count, XML path) rows, which are also printed as a table.
+    """
+    if not os.path.exists(video_file):
+        raise FileNotFoundError(f"Video file '{video_file}' does not exist.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    settings = parse_user_commands(user_commands)
+    thresholds = thresholds or [float(settings.get("threshold", DEFAULT_THRESHOLD))]
+    min_scene_lens = min_scene_lens or [settings.get("min_scene_len", DEFAULT_MIN_SCENE_LEN)]
+
+    score_data = load_frame_scores(video_file, settings, output_dir if score_cache else None, chunks, engine)
+    video_info = extract_video_info(video_file, output_dir if probe_cache else None)
+
+    rows = []
+    for threshold in thresholds:
+        for min_scene_len in min_scene_lens:
+            clips = scenes_from_scores(score_data, threshold, timecode_to_frames(min_scene_len, score_data["fps"]))
+            clips = refine_cuts(video_file, clips, settings, engine)
+            # Timecodes like 00:00:02 are not valid in Windows file names
+            suffix = f"-t{threshold:g}-m{re.sub(r'[^0-9A-Za-z.]', '_', str(min_scene_len))}"
+            if no_json:
+                xml_file = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(video_file))[0]}-Scenes{suffix}.xml")
+                convert_clips_to_xml(video_info, clips, xml_file)
+            else:
+                json_file = convert_csv_to_json(video_file, output_dir, probe_cache, clips, suffix, video_info, clip_format)
+                xml_file = os.path.splitext(json_file)[0] + ".xml"
+                convert_json_to_xml(json_file, xml_file)
+            rows.append((threshold, min_scene_len, len(clips), xml_file))
 
-def convert_csv_to_json(video_file, output_dir):
-    """Convert CSV output from PySceneDetect to JSON format."""
     base_name = os.path.splitext(os.path.basename(video_file))[0]
-    csv_file = os.path.join(output_dir, f"{base_name}-Scenes.csv")
-    json_file = os.path.join(output_dir, f"{base_name}-Scenes.json")
+    with open(os.path.join(output_dir, f"{base_name}-Sweep.csv"), mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Threshold", "Min Scene Length", "Scenes", "Cuts", "XML File"])
+        for threshold, min_scene_len, scene_count, xml_file in rows:
+            writer.writerow([threshold, min_scene_len, scene_count, scene_count - 1, os.path.basename(xml_file)])
+
+    print(f"\n{'Threshold':>10}  {'Min scene len':>14}  {'Scenes':>7}  {'Cuts':>6}  XML file")
+    for threshold, min_scene_len, scene_count, xml_file in rows:
+        print(f"{threshold:>10g}  {min_scene_len:>14}  {scene_count:>7}  {scene_count - 1:>6}  {os.path.basename(xml_file)}")
+    return rows
+
+def collect_video_files(input_dir=None, input_glob=None, input_list=None):
+    """Gather the videos for a batch run from a directory, a glob pattern and/or a list file."""
+    video_files = []
+    if input_dir:
+        if not os.path.isdir(input_dir):
+            raise NotADirectoryError(f"Input directory '{input_dir}' does not exist.")
+        for name in sorted(os.listdir(input_dir)):
+            path = os.path.join(input_dir, name)
+            if os.path.isfile(path) and name.lower().endswith(VIDEO_EXTENSIONS):
+                video_files.append(path)
+    if input_glob:
+        video_files.extend(sorted(glob.glob(input_glob, recursive=True)))
+    if input_list:
+        # One path per line, blank lines and # comments are ignored
+        with open(input_list, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    video_files.append(line)
+
+    # The same file listed twice is only processed once
+    return list(dict.fromkeys(os.path.abspath(path) for path in video_files))
+
+def _process_video_job(video_file, output_dir, user_commands, options):
+    # Runs in a worker process; errors are reported back instead of ending the batch
+    try:
+        return video_file, True, process_video(video_file, output_dir, user_commands, **options)
+    except Exception as e:
+        return video_file, False, str(e)
+
+def _plan_batch(video_files):
+    # Every video writes <name>-Scenes.* into the same output directory, so a name can only be used once.
+    # Returns the videos to process and the results of those that are not.
+    results = {}
+    jobs = []
+    output_names = {}
+    for video_file in video_files:
+        base_name = os.path.splitext(os.path.basename(video_file))[0]
+        if base_name in output_names:
+            results[video_file] = (False, f"Output name '{base_name}' already used by '{output_names[base_name]}'")
+        else:
+            output_names[base_name] = video_file
+            jobs.append(video_file)
+    return jobs, results
+
+def _report_batch(video_files, results, output_dir, combine_name=None, detector_layout="tracks"):
+    # Prints the per-file summary and writes the combined sequence. Returns the failure count.
+    failures = sum(1 for ok, _ in results.values() if not ok)
+    print(f"\nBatch summary: {len(results) - failures} succeeded, {failures} failed")
+    for video_file in video_files:
+        ok, detail = results[video_file]
+        if ok:
+            print(f"  OK      {video_file} -> {detail}")
+        else:
+            print(f"  FAILED  {video_file}: {detail}")
+
+    if combine_name:
+        json_files = [os.path.splitext(detail)[0] + ".json" for ok, detail in (results[video_file] for video_file in video_files) if ok]
+        xml_file = os.path.join(output_dir, f"{combine_name}.xml")
+        try:
+            if not json_files:
+                raise ValueError("no video succeeded")
+            convert_jsons_to_xml(json_files, xml_file, combine_name, detector_layout)
+            print(f"Combined sequence of {len(json_files)} video(s): {xml_file}")
+        except (OSError, ValueError) as e:
+            print(f"Combined sequence not written: {e}")
+            failures += 1
+    return failures
+
+def run_batch(video_files, output_dir, user_commands, workers=None, combine_name=None, **options):
+    """Process many videos in a process pool and print a per-file summary. Returns the failure count.
+
+    With combine_name the scenes of all videos that succeeded are also put back-to-back, in the
+    order of video_files, into one <combine_name>.xml sequence in output_dir.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, cpu_count, len(video_files)))
+    jobs, results = _plan_batch(video_files)
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Processing {len(jobs)} video(s) with {workers} worker(s)")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_process_video_job, video_file, output_dir, user_commands, options) for video_file in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            video_file, ok, detail = future.result()
+            results[video_file] = (ok, detail)
+            print(f"[{done}/{len(jobs)}] {'OK' if ok else 'FAILED'}: {video_file}")
+
+    return _report_batch(video_files, results, output_dir, combine_name, options.get("detector_layout", "tracks"))
+
+async def _detect_scenes_async(video_file, output_dir, user_commands, executor, semaphore, timeout, engine, score_cache, chunks, clip_source):
+    # Returns the clips and the other detectors' clips, or None when scenedetect wrote its CSV
+    import asyncio
+
+    async with semaphore:
+        if engine in ("api", "numpy", "keyframes"):
+            # Decoding and scoring are CPU bound, so they run in the process pool
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, detect_scenes_all, video_file, user_commands, output_dir if score_cache else None, chunks, engine, clip_source)
+        command = pyscenedetect_command(video_file, output_dir, user_commands)
+        print("Running command:", " ".join(command))
+        returncode, _, _ = await run_tool_async(command, timeout, capture=False)
+        if returncode != 0:
+            raise RuntimeError(f"Error running PySceneDetect: {subprocess.list2cmdline(command)} returned {returncode}")
+        return None, None
+
+async def process_video_async(video_file, output_dir, user_commands, executor, probe_semaphore, detect_semaphore, tool_timeout=None, detect_timeout=None,
+                              probe_cache=True, engine="cli", score_cache=True, chunks=1, clip_format="json", no_json=False, clip_source=None,
+                              detector_layout="tracks", save_images=False, contact_sheet=False, image_width=None, split_mode=None, split_workers=None):
+    """process_video on the event loop: ffprobe runs while the scenes are detected. Returns the XML path.
+
+    Detection waits for detect_semaphore and ffprobe for probe_semaphore, so a batch keeps many
+    cheap probes in flight while only a few heavy detections run. tool_timeout limits ffprobe and
+    detect_timeout the scenedetect command. The JSON and XML, the scene images and the scene videos are written in the executor.
+    """
+    import asyncio
 
-    if not os.path.exists(csv_file):
-        print(f"Error: CSV file '{csv_file}' does not exist.")
+    if not os.path.exists(video_file):
+        raise FileNotFoundError(f"Video file '{video_file}' does not exist.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    probe = asyncio.ensure_future(probe_video_async(video_file, output_dir if probe_cache else None, tool_timeout, probe_semaphore))
+    detect = asyncio.ensure_future(_detect_scenes_async(video_file, output_dir, user_commands, executor, detect_semaphore, detect_timeout, engine, score_cache, chunks, clip_source))
+    try:
+        ffprobe_output, (clips, detector_clips) = await asyncio.gather(probe, detect)
+    except BaseException:
+        # A failed detection stops the probe, and a failed probe kills scenedetect (engine cli). A detection
+        # already running in the process pool (api, numpy, keyframes) cannot be stopped: it finishes in
+        # its worker and its result is dropped, while the probe, which is cheap, is not waited for
+        probe.cancel()
+        detect.cancel()
+        await asyncio.gather(probe, detect, return_exceptions=True)
+        raise
+    video_info = video_info_from_probe(video_file, ffprobe_output)
+
+    loop = asyncio.get_running_loop()
+    xml_file = await loop.run_in_executor(executor, write_scene_files, video_file, output_dir, video_info, clips, probe_cache, clip_format, no_json, None,
+                                          detector_clips, detector_layout)
+    if save_images:
+        await loop.run_in_executor(executor, write_scene_images, video_file, output_dir, clips, contact_sheet, image_width)
+    if split_mode:
+        await loop.run_in_executor(executor, write_scene_videos, video_file, output_dir, clips, split_mode, split_workers, probe_cache)
+    return xml_file
+
+async def run_batch_async(video_files, output_dir, user_commands, workers=None, combine_name=None, probe_concurrency=16, tool_timeout=60.0, detect_timeout=None, **options):
+    """run_batch with asyncio: up to `workers` detections and `probe_concurrency` ffprobe calls at once. Returns the failure count."""
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, cpu_count, len(video_files)))
+    jobs, results = _plan_batch(video_files)
+    probe_semaphore = asyncio.Semaphore(max(1, probe_concurrency))
+    detect_semaphore = asyncio.Semaphore(workers)
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Processing {len(jobs)} video(s), {workers} detection(s) and up to {probe_concurrency} ffprobe call(s) at a time")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        async def job(video_file):
+            # Errors are reported back instead of ending the batch
+            try:
+                return video_file, True, await process_video_async(video_file, output_dir, user_commands, executor, probe_semaphore, detect_semaphore, tool_timeout, detect_timeout, **options)
+            except Exception as e:
+                return video_file, False, str(e)
+
+        for done, result in enumerate(asyncio.as_completed([job(video_file) for video_file in jobs]), start=1):
+            video_file, ok, detail = await result
+            results[video_file] = (ok, detail)
+            print(f"[{done}/{len(jobs)}] {'OK' if ok else 'FAILED'}: {video_file}")
+
+    return _report_batch(video_files, results, output_dir, combine_name, options.get("detector_layout", "tracks"))
+
+def _open_job_db(watch_dir):
+    connection = sqlite3.connect(os.path.join(watch_dir, WATCH_DB_NAME), timeout=30)
+    connection.execute("CREATE TABLE IF NOT EXISTS jobs (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, changed_at REAL, status TEXT, detail TEXT)")
+    return connection
+
+def scan_watch_dir(connection, watch_dir, settle):
+    """Record new and changed videos under watch_dir and queue those whose size and mtime have not changed for `settle` seconds."""
+    now = time.time()
+    known = {path: (size, mtime_ns) for path, size, mtime_ns in connection.execute("SELECT path, size, mtime_ns FROM jobs")}
+    with connection:
+        for root, _, names in os.walk(watch_dir):
+            for name in names:
+                if not name.lower().endswith(VIDEO_EXTENSIONS):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed while scanning
+                if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+                    # New, still being copied, or replaced after it was processed
+                    connection.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, 'waiting', NULL)", (path, stat.st_size, stat.st_mtime_ns, now))
+        connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'waiting' AND size > 0 AND changed_at <= ?", (now - settle,))
+
+def next_watch_jobs(connection, running_paths, free):
+    """Return up to `free` queued paths, oldest first, leaving out the ones still being processed.
+
+    A file replaced while its job runs is queued again by scan_watch_dir. It waits until that
+    job has finished, which leaves its status alone, so that two jobs never write the same files.
+    """
+    queued = connection.execute("SELECT path FROM jobs WHERE status = 'queued' ORDER BY changed_at, path").fetchall()
+    return [path for (path,) in queued if path not in running_paths][:max(0, free)]
+
+def run_watch(watch_dir, user_commands, workers=None, interval=10.0, settle=30.0, **options):
+    """Process every video that appears under watch_dir once, writing its files next to it. Runs until interrupted.
+
+    Jobs are kept in a sqlite table in watch_dir, so after a restart finished files are
+    skipped and files that were being processed are started again.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, cpu_count))
+    connection = _open_job_db(watch_dir)
+    with connection:
+        connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+
+    print(f"Watching {watch_dir} with {workers} worker(s), press Ctrl+C to stop")
+    running = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                scan_watch_dir(connection, watch_dir, settle)
+                free = workers - len(running)
+                for path in next_watch_jobs(connection, set(running.values()), free):
+                    with connection:
+                        connection.execute("UPDATE jobs SET status = 'running' WHERE path = ?", (path,))
+                    running[executor.submit(_process_video_job, path, os.path.dirname(path), user_commands, options)] = path
+                    print(f"Started: {path}")
+
+                if not running:
+                    time.sleep(interval)
+                    continue
+                done, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = running.pop(future)
+                    try:
+                        _, ok, detail = future.result()
+                    except Exception as e:  # The worker process died
+                        ok, detail = False, str(e)
+                    # A file replaced while it was processed is already waiting again and stays so
+                    with connection:
+                        connection.execute("UPDATE jobs SET status = ?, detail = ? WHERE path = ? AND status = 'running'", ("done" if ok else "failed", detail, path))
+                    print(f"{'OK' if ok else 'FAILED'}: {path}" + (f" -> {detail}" if ok else f": {detail}"))
+    except KeyboardInterrupt:
+        print("Stopped. Unfinished videos are processed again on the next start.")
+    finally:
+        connection.close()
+
+def main(video_file, output_dir, user_commands, **options):
+    if not check_ffmpeg_ffprobe():
+        print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
         exit(1)
 
-    clips = []
-    with open(csv_file, mode='r', newline='') as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip the first line
-        headers = next(reader)  # Read the second line as headers
-        for row in reader:
-            row_dict = dict(zip(headers, row))
-            clip = {
-                "id": row_dict["Scene Number"],
-                "start": int(row_dict["Start Frame"]) - 1,
-                "end": int(row_dict["End Frame"])
-            }
-            clips.append(clip)
-
-    video_data = extract_video_info(video_file)
-    combined_data = video_data
-    combined_data["clips"] = clips
-
-    with open(json_file, mode='w') as file:
-        json.dump(combined_data, file, indent=4)
-
-    return json_file  # Return the path of the JSON file for further processing
-
-def extract_video_info(video_file):
-    cmd = [
-        "ffprobe", "-v", "error", "-show_entries",
-        "stream=index,codec_type,width,height,display_aspect_ratio,r_frame_rate,duration,sample_rate,channels,bits_per_raw_sample",
-        "-of", "json", video_file
-    ]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    ffprobe_output = json.loads(result.stdout)
-
-    video_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "video"), None)
-    audio_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "audio"), None)
-
-    if not video_stream:
-        raise ValueError("Video stream not found in the file.")
-
-    frame_rate_str = video_stream["r_frame_rate"]
-    frame_rate = round(eval(frame_rate_str))
-    duration_seconds = float(video_stream["duration"])
-    duration_frames = int(duration_seconds * frame_rate)
-    anamorphic = "TRUE" if video_stream.get("display_aspect_ratio", "16:9") != "16:9" else "FALSE"
-
-    # Extract the start timecode using ffprobe
-    timecode = "00:00:00:00"  # Default value
     try:
-        cmd = [
-            "ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
-            "format_tags=timecode", "-of", "default=noprint_wrappers=1:nokey=1", video_file
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        if result.stdout.strip():
-            timecode = result.stdout.strip()
+        process_video(video_file, output_dir, user_commands, **options)
     except Exception as e:
-        print(f"Could not extract timecode: {e}")
-
-    video_info = {
-        "sequence": {
-            "name": os.path.splitext(os.path.basename(video_file))[0]
-        },
-        "video": {
-            "file": {
-                "name": os.path.basename(video_file),
-                "pathurl": os.path.abspath(video_file).replace("\\", "/"),
-                "media": {
-                    "video": {
-                        "duration": duration_frames,
-                        "timecode": {
-                            "rate": {
-                                "ntsc": "TRUE" if frame_rate in [23.976, 23.976023976023978, 29.97, 29.976023976023978, 59.94] else "FALSE",
-                                "timebase": int(frame_rate) if isinstance(frame_rate, int) else frame_rate
-                            },
-                            "displayformat": "DF" if frame_rate in [29.97, 59.94] else "NDF",
-                            "first_timecode": timecode  # Timecode of the first frame
-                        },
-                        "samplecharacteristics": {
-                            "width": video_stream["width"],
-                            "height": video_stream["height"],
-                            "anamorphic": anamorphic, 
-                            "pixelaspectratio": "Square"
-                        }
-                    }
-                }
-            }
-        }
-    }
-
-    if audio_stream:
-        video_info["video"]["file"]["media"]["audio"] = {
-            "samplecharacteristics": {
-                "depth": audio_stream.get("bits_per_raw_sample", 16),
-                "samplerate": audio_stream.get("sample_rate", "N/A")
-            },
-            "channelcount": audio_stream.get("channels", "N/A")
-        }
-
-    return video_info
-
-def convert_json_to_xml(json_file_path, xml_file_path):
+        print(f"Error: {e}")
+        exit(1)
+
+def main_sweep(video_file, output_dir, user_commands, thresholds, min_scene_lens, probe_cache=True, score_cache=True, chunks=1, engine="cli", clip_format="json", no_json=False, **options):
+    if not check_ffmpeg_ffprobe():
+        print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
+        exit(1)
+
     try:
-        with open(json_file_path, 'r') as json_file:
-            data = json.load(json_file)
-            root = create_xml_structure(data)
-            tree_str = ET.tostring(root, encoding='utf-8')
-            pretty_xml_as_string = parseString(tree_str).toprettyxml(indent="  ")
-            # Add XML declaration and doctype
-            xml_content = '<?xml version="1.0" ?>\n<!DOCTYPE xmeml>\n' + pretty_xml_as_string.split('?>', 1)[1].strip()
-            with open(xml_file_path, 'w', encoding='utf-8') as f:
-                f.write(xml_content)
-            print("Conversion completed successfully!")
+        # The sweep always scores in-process, every frame; only --engine numpy and keyframes change how
+        run_sweep(video_file, output_dir, user_commands, thresholds, min_scene_lens, probe_cache, score_cache, chunks, "numpy" if engine in ("numpy", "keyframes") else "api", clip_format, no_json)
     except Exception as e:
-        print(f"Error: {str(e)}")
-
-def create_xml_structure(data):
-    # Root element
-    root = ET.Element("xmeml", version="5")
-    
-    # Sequence element
-    sequence = ET.SubElement(root, "sequence", id="sequence-1")
-    
-    # Sequence name from JSON
-    ET.SubElement(sequence, "name").text = data["sequence"]["name"]
-    
-    # Duration from JSON
-    ET.SubElement(sequence, "duration").text = str(data["video"]["file"]["media"]["video"]["duration"])
-    
-    # Add rate element
-    add_rate(sequence, data["video"]["file"]["media"]["video"]["timecode"]["rate"])
-
-    # Timecode element
-    timecode = ET.SubElement(sequence, "timecode")
-    add_rate(timecode, data["video"]["file"]["media"]["video"]["timecode"]["rate"])
-    
-    # Default timecode settings
-    ET.SubElement(timecode, "string").text = "00:00:00:00"
-    ET.SubElement(timecode, "frame").text = "0"
-    ET.SubElement(timecode, "source").text = "source"
-    ET.SubElement(timecode, "displayformat").text = data["video"]["file"]["media"]["video"]["timecode"]["displayformat"]
-
-    # Default sequence in and out points
-    ET.SubElement(sequence, "in").text = "-1"
-    ET.SubElement(sequence, "out").text = "-1"
-
-    # Media element
-    media = ET.SubElement(sequence, "media")
-    
-    # Video element under media
-    video = ET.SubElement(media, "video")
-
-    # Track element under video
-    video_track = ET.SubElement(video, "track")
-    for i, clip in enumerate(data["clips"], start=1):
-        clip_id = f"Clip {i}"
-        add_clipitem(video_track, clip, "video", clip_id, i == 1, data["video"]["file"], data["video"]["file"]["media"]["video"]["timecode"]["rate"], data["video"]["file"]["media"]["audio"]["channelcount"])
-
-    # Audio elements and tracks
-    audio_clip_id = 1
-    audio = ET.SubElement(media, "audio")
-    channel_count = data["video"]["file"]["media"]["audio"]["channelcount"]
-    for channel in range(1, channel_count + 1):
-        add_audio_track(audio, data["clips"], audio_clip_id, channel, data["video"]["file"], data["video"]["file"]["media"]["video"]["timecode"]["rate"], channel_count)
-        audio_clip_id += len(data["clips"])
-
-    return root
-
-def add_rate(parent, rate_data):
-    # Adding rate element with its sub-elements from JSON
-    rate = ET.SubElement(parent, "rate")
-    ET.SubElement(rate, "ntsc").text = rate_data.get("ntsc", "FALSE")
-    ET.SubElement(rate, "timebase").text = str(rate_data.get("timebase", 30))
-
-def add_clipitem(parent, clip, media_type, clip_id, add_file, file_data, rate_data, channel_count):
-    # Adding clipitem element with various properties from JSON
-    clip_item = ET.SubElement(parent, "clipitem", id=clip_id)
-    ET.SubElement(clip_item, "name").text = file_data["name"]
-    ET.SubElement(clip_item, "enabled").text = "TRUE"
-    ET.SubElement(clip_item, "duration").text = str(clip["end"] - clip["start"])
-    add_rate(clip_item, rate_data)
-    ET.SubElement(clip_item, "in").text = str(clip["start"])
-    ET.SubElement(clip_item, "out").text = str(clip["end"])
-    ET.SubElement(clip_item, "start").text = str(clip["start"])
-    ET.SubElement(clip_item, "end").text = str(clip["end"])
-    ET.SubElement(clip_item, "anamorphic").text = "FALSE"
-    ET.SubElement(clip_item, "pixelaspectratio").text = "Square"
-    ET.SubElement(clip_item, "alphatype").text = "none"
-
-    if add_file:
-        # Add file element only for the first clipitem
-        add_file_element(clip_item, file_data, rate_data)
-    else:
-        # Reference to the file element for other clipitems
-        ET.SubElement(clip_item, "file", id="file-1")
-
-    # Adding sourcetrack element with mediatype from JSON or defaults
-    sourcetrack = ET.SubElement(clip_item, "sourcetrack")
-    ET.SubElement(sourcetrack, "mediatype").text = media_type
-    if media_type == "audio":
-        track_index = 1 if clip_id.startswith("ClipA1") else 2
-        ET.SubElement(sourcetrack, "trackindex").text = str(track_index)
-
-    # Adding link elements for clipitem
-    add_link_elements(clip_item, clip_id, media_type, channel_count)
-
-def add_file_element(parent, file_data, rate_data):
-    # Adding file element with properties from JSON
-    file_element = ET.SubElement(parent, "file", id="file-1")
-    ET.SubElement(file_element, "name").text = file_data["name"]
-    ET.SubElement(file_element, "pathurl").text = file_data["pathurl"]
-    add_rate(file_element, rate_data)
-    ET.SubElement(file_element, "duration").text = str(file_data["media"]["video"]["duration"])
-
-    # Adding timecode element with properties from JSON
-    file_timecode = ET.SubElement(file_element, "timecode")
-    add_rate(file_timecode, rate_data)
-    ET.SubElement(file_timecode, "string").text = file_data["media"]["video"]["timecode"]["first_timecode"]
-    ET.SubElement(file_timecode, "frame").text = "0"
-    ET.SubElement(file_timecode, "source").text = "source"
-    ET.SubElement(file_timecode, "displayformat").text = file_data["media"]["video"]["timecode"]["displayformat"]
-
-    # Adding media element with video and audio properties from JSON
-    file_media = ET.SubElement(file_element, "media")
-    video = ET.SubElement(file_media, "video")
-    add_video_format(video, file_data["media"]["video"]["samplecharacteristics"], rate_data)
-    if "audio" in file_data["media"]:
-        audio = ET.SubElement(file_media, "audio")
-        add_audio_format(audio, file_data["media"]["audio"]["samplecharacteristics"], file_data["media"]["audio"]["channelcount"])
-
-def add_video_format(video, samplecharacteristics, rate_data):
-    # Adding video format and sample characteristics from JSON
-    sample_characteristics = ET.SubElement(video, "samplecharacteristics")
-    add_rate(sample_characteristics, rate_data)
-    ET.SubElement(sample_characteristics, "width").text = str(samplecharacteristics["width"])
-    ET.SubElement(sample_characteristics, "height").text = str(samplecharacteristics["height"])
-    ET.SubElement(sample_characteristics, "anamorphic").text = samplecharacteristics["anamorphic"]
-    ET.SubElement(sample_characteristics, "pixelaspectratio").text = samplecharacteristics["pixelaspectratio"]
-
-def add_audio_format(audio, samplecharacteristics, channel_count):
-    # Adding audio format and sample characteristics from JSON
-    sample_characteristics = ET.SubElement(audio, "samplecharacteristics")
-    ET.SubElement(sample_characteristics, "depth").text = str(samplecharacteristics["depth"])
-    ET.SubElement(sample_characteristics, "samplerate").text = str(samplecharacteristics["samplerate"])
-    ET.SubElement(audio, "channelcount").text = str(channel_count)
-
-def add_audio_track(parent, clips, start_id, track_index, file_data, rate_data, channel_count):
-    # Adding audio track with clipitems from JSON
-    audio_track = ET.SubElement(parent, "track")
-    for i, clip in enumerate(clips, start=1):
-        clip_id = f"ClipA{track_index} {start_id + i - 1}"
-        add_clipitem(audio_track, clip, "audio", clip_id, False, file_data, rate_data, channel_count)
-    ET.SubElement(audio_track, "enabled").text = "TRUE"
-    ET.SubElement(audio_track, "locked").text = "FALSE"
-    ET.SubElement(audio_track, "outputchannelindex").text = str(track_index)
-
-def add_link_elements(clip_item, clip_id, media_type, channel_count):
-    # Adding link elements to clipitem to ensure proper video and audio synchronization
-    clip_index = clip_id.split()[-1]
-    video_link = (f"Clip {clip_index}", "video", 1, clip_index)
-    audio_links = [(f"ClipA{channel} {clip_index}", "audio", channel, clip_index) for channel in range(1, channel_count + 1)]
-
-    # Ensure the first link is always video, followed by audio channels
-    links = [video_link] + audio_links
-
-    for linkclipref, linkmediatype, trackindex, clipindex in links:
-        link = ET.SubElement(clip_item, "link")
-        ET.SubElement(link, "linkclipref").text = linkclipref
-        ET.SubElement(link, "mediatype").text = linkmediatype
-        ET.SubElement(link, "trackindex").text = str(trackindex)
-        ET.SubElement(link, "clipindex").text = clipindex
-        if linkmediatype == "audio":
-            ET.SubElement(link, "groupindex").text = "1"
-
-def main(video_file, output_dir, user_commands):
+        print(f"Error: {e}")
+        exit(1)
+
+def main_batch(video_files, output_dir, user_commands, workers=None, combine_name=None, **options):
     if not check_ffmpeg_ffprobe():
         print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
         exit(1)
 
-    if not os.path.exists(video_file):
-        print(f"Error: Video file '{video_file}' does not exist.")
+    if not video_files:
+        print("Error: No video files found for the batch.")
         exit(1)
 
-    os.makedirs(output_dir, exist_ok=True)
+    if run_batch(video_files, output_dir, user_commands, workers, combine_name, **options):
+        exit(1)
+
+def main_async(video_files, output_dir, user_commands, workers=None, combine_name=None, probe_concurrency=16, tool_timeout=60.0, detect_timeout=None, **options):
+    import asyncio
 
-    run_pyscenedetect(video_file, output_dir, user_commands)
+    if not asyncio.run(check_ffmpeg_ffprobe_async(tool_timeout)):
+        print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
+        exit(1)
 
-    json_file = convert_csv_to_json(video_file, output_dir)
-    xml_file = os.path.splitext(json_file)[0] + ".xml"
-    convert_json_to_xml(json_file, xml_file)
+    if not video_files:
+        print("Error: No video files found for the batch.")
+        exit(1)
+
+    if asyncio.run(run_batch_async(video_files, output_dir, user_commands, workers, combine_name, probe_concurrency, tool_timeout, detect_timeout, **options)):
+        exit(1)
+
+def main_watch(watch_dir, user_commands, workers=None, interval=10.0, settle=30.0, **options):
+    if not check_ffmpeg_ffprobe():
+        print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
+        exit(1)
+
+    if not os.path.isdir(watch_dir):
+        print(f"Error: Watch directory '{watch_dir}' does not exist.")
+        exit(1)
+
+    # Service managers stop the watcher with SIGTERM; handle it like Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        run_watch(watch_dir, user_commands, workers, interval, settle, **options)
+    except sqlite3.Error as e:
+        print(f"Error: Job table in '{watch_dir}': {e}")
+        exit(1)
 
 if __name__ == "__main__":
+    # Needed for the process pool when running as a pyinstaller .exe
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
     parser = argparse.ArgumentParser(description="Detect scenes in a video, convert to JSON, and output as XML.")
-    parser.add_argument("--video_file", required=True, help="Path to the video file")
-    parser.add_argument("--output_dir", required=True, help="Directory to store the output files")
+    parser.add_argument("--video_file", help="Path to the video file")
+    parser.add_argument("--input_dir", help="Batch mode: process every video file in this directory")
+    parser.add_argument("--input_glob", help="Batch mode: process every file matching this glob pattern, e.g. \"D:/cards/**/*.mxf\"")
+    parser.add_argument("--input_list", help="Batch mode: text file with one video path per line")
+    parser.add_argument("--workers", type=int, help="Batch and watch mode: number of videos processed at once (default and maximum: CPU core count)")
+    parser.add_argument("--combine_xml", metavar="NAME", help="Batch mode: also write NAME.xml, one sequence with the scenes of every video placed back-to-back, so a whole shoot is imported into EDIUS at once")
+    parser.add_argument("--asyncio", action="store_true", help="Single video and batch mode: run ffprobe while the scenes are detected, and in a batch keep many ffprobe calls in flight while --workers detections run")
+    parser.add_argument("--probe_concurrency", type=int, default=16, help="--asyncio: number of ffprobe calls run at once")
+    parser.add_argument("--tool_timeout", type=float, default=60.0, help="--asyncio: seconds after which an ffprobe or tool check call is stopped")
+    parser.add_argument("--detect_timeout", type=float, help="--asyncio: seconds after which the scenedetect command is stopped (default: no limit)")
+    parser.add_argument("--watch", help="Watch mode: keep processing new videos that appear in this directory (and its subdirectories), writing the output files next to each video")
+    parser.add_argument("--watch_interval", type=float, default=10.0, help="Watch mode: seconds between scans of the directory")
+    parser.add_argument("--watch_settle", type=float, default=30.0, help="Watch mode: seconds a file's size and modification time must stay unchanged before it is processed")
+    parser.add_argument("--output_dir", help="Directory to store the output files (not used in watch mode)")
+    parser.add_argument("--engine", choices=["cli", "api", "numpy", "keyframes"], default="cli", help="cli: run the scenedetect command and read its CSV (default). api: detect in-process with the scenedetect Python package. numpy: score raw frames piped from ffmpeg with NumPy, without scenedetect. keyframes: as numpy, but compare the keyframes first and only decode every frame around the likely cuts")
+    parser.add_argument("--clip_source", choices=["content", "threshold", "adaptive"], help="--engine numpy: detector whose scenes become the clips (default: the first detect-* command given). Every detect-content, detect-threshold and detect-adaptive command is run on one decode of the video")
+    parser.add_argument("--detector_layout", choices=DETECTOR_LAYOUTS, default="tracks", help="--engine numpy with several detect-* commands: put the scenes of the detectors other than --clip_source on video tracks of their own above V1 (tracks, default), or as sequence markers at their cuts (markers)")
+    parser.add_argument("--save_images", action="store_true", help="Save the first and last frame of every scene as <name>-Scene-NNN-01.jpg and -02.jpg in the output directory, all grabbed in one sequential ffmpeg pass (instead of PySceneDetect's save-images, which seeks once per scene)")
+    parser.add_argument("--contact_sheet", action="store_true", help="As --save_images, plus <name>-Sheet-NN.jpg pages of first-frame thumbnails")
+    parser.add_argument("--image_width", type=int, help="--save_images: scale the images to this width (default: full size)")
+    parser.add_argument("--split_video", choices=SPLIT_MODES, help="Export every scene to <name>-Scene-NNN in the output directory with ffmpeg processes running in parallel (instead of PySceneDetect's split-video, which encodes one scene after another). copy: stream copy in the video's container, each file starting at the keyframe at or before its scene. encode: frame-accurate H.264/AAC .mp4 files")
+    parser.add_argument("--split_workers", type=int, help="--split_video: scenes exported at once per video (default: 4 for copy; for encode half the CPU cores, which share all cores between them)")
+    parser.add_argument("--no_score_cache", action="store_true", help="--engine api/numpy: always decode the video instead of reusing the per-frame scores saved in -Scores-<key>.json")
+    parser.add_argument("--proxy_scale", type=int, help="Fast mode: detect on frames downscaled by this factor (PySceneDetect --downscale; by default it picks a factor for a ~256 pixel wide proxy)")
+    parser.add_argument("--sample_every", type=int, help="Fast mode: only analyse every Nth frame (PySceneDetect --frame-skip N-1), then find the exact frame of each cut. Needs --engine api or numpy (sweep mode scores in-process anyway)")
+    parser.add_argument("--chunks", type=int, default=1, help="--engine api and sweep mode: split each video into this many time ranges that are decoded in parallel worker processes")
+    parser.add_argument("--sweep_thresholds", type=lambda value: [float(v) for v in value.split(",")], help="Sweep mode: comma separated detect-content thresholds, e.g. 20,27,35. The video is decoded once and a -Scenes-t<threshold>-m<min length> JSON/XML pair is written per combination")
+    parser.add_argument("--sweep_min_scene_lens", type=lambda value: value.split(","), help="Sweep mode: comma separated minimum scene lengths, e.g. 0,1s,2s")
+    parser.add_argument("--no_probe_cache", action="store_true", help=f"Always run ffprobe instead of reusing results cached in {PROBE_CACHE_NAME} in the output directory")
+    parser.add_argument("--clip_format", choices=["json", "binary"], default="json", help="json: clips listed in the -Scenes.json file (default). binary: clips in a compact -Scenes.clips file next to it, for videos with very many scenes")
+    parser.add_argument("--no_json", action="store_true", help="Write the XML straight from the detected scenes (or the scenedetect CSV) without writing a -Scenes.json file")
+    parser.add_argument("--profile", action="store_true", help="Write wall/CPU/subprocess time and bytes read/written per stage to <name>-Profile.json in the output directory")
+    parser.add_argument("--profile_python", action="store_true", help="As --profile, plus a cProfile dump of the Python stages in <name>-Profile.pstats")
     parser.add_argument('user_commands', nargs=argparse.REMAINDER, help="Additional PySceneDetect commands")
     args = parser.parse_args()
 
-    main(args.video_file, args.output_dir, args.user_commands)
+    # "--" only separates the script's options from PySceneDetect's, as shown in the README
+    if args.user_commands[:1] == ["--"]:
+        args.user_commands = args.user_commands[1:]
+
+    # Fast mode settings are PySceneDetect global options, which go before the commands
+    fast_options = []
+    if args.proxy_scale:
+        fast_options += ["--downscale", str(args.proxy_scale)]
+    if args.sample_every and args.sample_every > 1:
+        fast_options += ["--frame-skip", str(args.sample_every - 1)]
+    args.user_commands = fast_options + args.user_commands
+
+    batch_inputs = (args.input_dir, args.input_glob, args.input_list)
+    if args.watch and (args.video_file or any(batch_inputs) or args.output_dir):
+        parser.error("--watch cannot be combined with --video_file, --input_dir, --input_glob, --input_list or --output_dir")
+    if not args.watch and not args.output_dir:
+        parser.error("--output_dir is required")
+    if args.video_file and any(batch_inputs):
+        parser.error("--video_file cannot be combined with --input_dir, --input_glob or --input_list")
+    if not args.video_file and not any(batch_inputs) and not args.watch:
+        parser.error("one of --video_file, --input_dir, --input_glob, --input_list or --watch is required")
+
+    if args.no_json and args.clip_format == "binary":
+        parser.error("--clip_format binary needs the JSON file, so it cannot be combined with --no_json")
+
+    if args.combine_xml and not any(batch_inputs):
+        parser.error("--combine_xml needs --input_dir, --input_glob or --input_list")
+    if args.combine_xml and args.no_json:
+        parser.error("--combine_xml is made from the -Scenes.json files, so it cannot be combined with --no_json")
+
+    sweep = args.sweep_thresholds or args.sweep_min_scene_lens
+    if sweep and not args.video_file:
+        parser.error("--sweep_thresholds and --sweep_min_scene_lens work on a single --video_file")
+
+    if args.engine == "cli" and not sweep and args.sample_every and args.sample_every > 1:
+        # scenedetect reports the sampled frames, so its cuts could be up to N-1 frames late
+        parser.error("--sample_every needs --engine api or numpy, which move each cut found on a sampled frame to its exact frame")
+    if args.engine == "keyframes" and args.sample_every and args.sample_every > 1:
+        parser.error("--engine keyframes already samples the keyframes, so it cannot be combined with --sample_every")
+    if args.clip_source and args.engine != "numpy":
+        parser.error("--clip_source needs --engine numpy")
+    if args.clip_source and sweep:
+        parser.error("sweep mode only cuts detect-content scores, so it cannot be combined with --clip_source")
+
+    args.save_images = args.save_images or args.contact_sheet
+    if args.save_images and sweep:
+        parser.error("--save_images and --contact_sheet cannot be combined with sweep mode, which writes several scene lists")
+    if args.save_images and "save-images" in args.user_commands:
+        parser.error("--save_images replaces PySceneDetect's save-images command; give only one of them")
+    if args.split_video and sweep:
+        parser.error("--split_video cannot be combined with sweep mode, which writes several scene lists")
+    if args.split_video and args.watch:
+        # The scene files would land in the watched directory and be queued as new videos
+        parser.error("--split_video cannot be combined with --watch, which writes its output files into the watched directory")
+    passthrough_outputs = [command for command in ("split-video", "save-images") if command in args.user_commands]
+    if args.watch and passthrough_outputs:
+        # scenedetect would write its -Scene-NNN files into the watched directory too
+        parser.error(f"{passthrough_outputs[0]} cannot be combined with --watch, which writes its output files into the watched directory")
+    if args.split_video and "split-video" in args.user_commands:
+        parser.error("--split_video replaces PySceneDetect's split-video command; give only one of them")
+
+    if args.asyncio and (args.watch or sweep):
+        parser.error("--asyncio works with --video_file and the batch inputs, not with --watch or sweep mode")
+    if args.asyncio and (args.profile or args.profile_python):
+        parser.error("--profile times the stages one after another, so it cannot be combined with --asyncio")
+
+    options = {"probe_cache": not args.no_probe_cache, "engine": args.engine, "score_cache": not args.no_score_cache, "chunks": args.chunks,
+               "profile": args.profile, "profile_python": args.profile_python, "clip_format": args.clip_format, "no_json": args.no_json,
+               "clip_source": args.clip_source, "detector_layout": args.detector_layout, "save_images": args.save_images,
+               "contact_sheet": args.contact_sheet, "image_width": args.image_width, "split_mode": args.split_video, "split_workers": args.split_workers}
+
+    if args.asyncio:
+        async_options = {key: value for key, value in options.items() if key not in ("profile", "profile_python")}
+        if args.video_file:
+            video_files = [os.path.abspath(args.video_file)]
+        else:
+            try:
+                video_files = collect_video_files(args.input_dir, args.input_glob, args.input_list)
+            except OSError as e:
+                print(f"Error: {e}")
+                exit(1)
+        main_async(video_files, args.output_dir, args.user_commands, args.workers, args.combine_xml, args.probe_concurrency, args.tool_timeout, args.detect_timeout, **async_options)
+    elif args.watch:
+        main_watch(args.watch, args.user_commands, args.workers, args.watch_interval, args.watch_settle, **options)
+    elif sweep:
+        main_sweep(args.video_file, args.output_dir, args.user_commands, args.sweep_thresholds, args.sweep_min_scene_lens, **options)
+    elif args.video_file:
+        main(args.video_file, args.output_dir, args.user_commands, **options)
+    else:
+        try:
+            video_files = collect_video_files(args.input_dir, args.input_glob, args.input_list)
+        except OSError as e:
+            print(f"Error: {e}")
+            exit(1)
+        main_batch(video_files, args.output_dir, args.user_commands, args.workers, args.combine_xml, **options)
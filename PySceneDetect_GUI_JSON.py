@@ -1,209 +1,352 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import csv
-import json
-import os
-import subprocess
-
-class CSVtoJSON(tk.Tk):
-    def __init__(self):
-        super().__init__()
-
-        self.title("PySceneDetect GUI and CSV to JSON file with metadata")
-        self.geometry("600x400")
-
-        # Video file selection
-        self.video_file = tk.StringVar()
-        tk.Label(self, text="Select Video File:").pack(pady=5)
-        tk.Entry(self, textvariable=self.video_file, width=50).pack(pady=5)
-        tk.Button(self, text="Browse Video", command=self.select_video_file).pack(pady=5)
-
-        # Options
-        self.split_video = tk.BooleanVar()
-        self.save_images = tk.BooleanVar()
-        self.start_seconds = tk.IntVar(value=0)
-        self.min_scene_length = tk.IntVar(value=1)
-
-        tk.Checkbutton(self, text="Split Video", variable=self.split_video).pack(pady=5)
-        tk.Checkbutton(self, text="Save Images", variable=self.save_images).pack(pady=5)
-
-        tk.Label(self, text="Skip first N seconds (time --start):").pack(pady=5)
-        tk.Entry(self, textvariable=self.start_seconds).pack(pady=5)
-
-        tk.Label(self, text="Minimum length of any scene (--min-scene-len):").pack(pady=5)
-        tk.Entry(self, textvariable=self.min_scene_length).pack(pady=5)
-
-        # Buttons
-        button_frame = tk.Frame(self)
-        button_frame.pack(pady=20)
-        tk.Button(button_frame, text="Process", command=self.process).pack(side=tk.LEFT, padx=10)
-        tk.Button(button_frame, text="Cancel", command=self.quit).pack(side=tk.LEFT, padx=10)
-
-    def select_video_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Video Files", "*.mp4 *.avi *.mkv *.mov")])
-        if file_path:
-            self.video_file.set(file_path)
-
-    def process(self):
-        video_file = self.video_file.get()
-        if not video_file:
-            messagebox.showerror("Error", "Please select a video file.")
-            return
-
-        # Check ffmpeg and ffprobe availability
-        if not self.check_ffmpeg_ffprobe():
-            messagebox.showerror("Error", "ffmpeg or ffprobe is unavailable. Please check if their path has been added to the Environment Variables.")
-            self.quit()
-            return
-
-        try:
-            # Check write permissions for the output directory
-            output_dir = os.path.dirname(video_file)
-            if not os.access(output_dir, os.W_OK):
-                raise PermissionError(f"No write permission to the directory: {output_dir}")
-
-            # Run PySceneDetect
-            self.run_pyscenedetect(video_file, output_dir)
-
-            # Convert CSV to JSON with metadata
-            self.convert_csv_to_json(video_file, output_dir)
-
-            messagebox.showinfo("Finished", f"Processing successful. JSON saved in the same directory as the video file.")
-            self.quit()
-        except PermissionError as e:
-            messagebox.showerror("Permission Error", str(e))
-            self.quit()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error occurred: {str(e)}")
-
-    def check_ffmpeg_ffprobe(self):
-        try:
-            subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            subprocess.run(["ffprobe", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return True
-        except FileNotFoundError:
-            return False
-
-    def run_pyscenedetect(self, video_file, output_dir):
-        output_csv = os.path.join(output_dir, os.path.splitext(os.path.basename(video_file))[0] + "-Scenes.csv")
-
-        # Construct the command for PySceneDetect
-        cmd = f'scenedetect --input "{video_file}" --output "{output_dir}" --min-scene-len {self.min_scene_length.get()}s detect-content list-scenes'
-
-        if self.start_seconds.get() > 0:
-            cmd += f' time --start {self.start_seconds.get()}s'
-
-        if self.split_video.get():
-            cmd += ' split-video'
-
-        if self.save_images.get():
-            cmd += ' save-images'
-
-        # Print the command for debugging purposes
-        print(f"Running command: {cmd}")
-
-        # Execute the command
-        subprocess.run(cmd, shell=True, check=True)
-
-    def convert_csv_to_json(self, video_file, output_dir):
-        csv_file = os.path.join(output_dir, os.path.splitext(os.path.basename(video_file))[0] + "-Scenes.csv")
-        json_file = os.path.join(output_dir, os.path.splitext(os.path.basename(video_file))[0] + "-Scenes.json")
-
-        clips = []
-        with open(csv_file, mode='r', newline='') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip the first line
-            headers = next(reader)  # Read the second line as headers
-            for row in reader:
-                row_dict = dict(zip(headers, row))
-                clip = {
-                    "id": row_dict["Scene Number"],
-                    "start": int(row_dict["Start Frame"]) - 1,
-                    "end": int(row_dict["End Frame"])
-                }
-                clips.append(clip)
-
-        video_data = self.extract_video_info(video_file)
-        combined_data = video_data
-        combined_data["clips"] = clips
-
-        with open(json_file, mode='w') as file:
-            json.dump(combined_data, file, indent=4)
-
-    def extract_video_info(self, video_file):
-        cmd = [
-            "ffprobe", "-v", "error", "-show_streams", "-show_format",
-            "-of", "json", video_file
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-        ffprobe_output = json.loads(result.stdout)
-
-        video_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "video"), None)
-        audio_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "audio"), None)
-
-        if not video_stream:
-            raise ValueError("Video stream not found in the file.")
-
-        frame_rate_str = video_stream["r_frame_rate"]
-        frame_rate = eval(frame_rate_str)
-        duration_seconds = float(video_stream["duration"])
-        duration_frames = int(duration_seconds * frame_rate)
-
-        # Extract the start timecode using ffprobe
-        timecode = "00:00:00:00"  # Default value
-        try:
-            cmd = [
-                "ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
-                "format_tags=timecode", "-of", "default=noprint_wrappers=1:nokey=1", video_file
-            ]
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-            if result.stdout.strip():
-                timecode = result.stdout.strip()
-        except Exception as e:
-            print(f"Could not extract timecode: {e}")
-
-        video_metadata = {
-            "sequence": {
-                "name": os.path.splitext(os.path.basename(video_file))[0]
-            },
-            "video": {
-                "file": {
-                    "name": os.path.basename(video_file),
-                    "pathurl": os.path.abspath(video_file).replace("\\", "/"),
-                    "media": {
-                        "video": {
-                            "duration": duration_frames,
-                            "timecode": {
-                                "rate": {
-                                    "ntsc": "TRUE" if frame_rate in [23.976, 29.97, 59.94] else "FALSE",
-                                    "timebase": int(frame_rate) if isinstance(frame_rate, int) else frame_rate
-                                },
-                                "displayformat": "DF" if frame_rate in [29.97, 59.94] else "NDF",
-                                "first_timecode": timecode  # Timecode of the first frame
-                            },
-                            "samplecharacteristics": {
-                                "width": video_stream["width"],
-                                "height": video_stream["height"],
-                                "anamorphic": "TRUE" if video_stream["display_aspect_ratio"] != "16:9" and video_stream["width"] <= 768 else "FALSE",
-                                "pixelaspectratio": "Square"
-                            }
-                        }
-                    }
-                }
-            }
-        }
-
-        if audio_stream:
-            video_metadata["video"]["file"]["media"]["audio"] = {
-                "samplecharacteristics": {
-                    "depth": audio_stream.get("bits_per_raw_sample", 16),
-                    "samplerate": audio_stream["sample_rate"]
-                },
-                "channelcount": audio_stream["channels"]
-            }
-
-        return video_metadata
-
-if __name__ == "__main__":
-    app = CSVtoJSON()
-    app.mainloop()
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import multiprocessing
+import os
+import queue
+import re
+import subprocess
+import threading
+
+from edius_core.clips import convert_csv_to_json
+from edius_core.detection import detect_scenes_api
+from edius_core.images import save_scene_images_from_json
+from edius_core.split import split_video_from_json
+from edius_core.probe import check_ffmpeg_ffprobe
+
+# scenedetect's progress bar, e.g. "199/300 [00:00<00:00, 990.12frames/s]"
+PROGRESS_PATTERN = re.compile(r"(\d+)/(\d+) \[[\d:]+<([\d:?]+), *([\d.?]+) *frames/s\]")
+
+class JobCancelled(Exception):
+    pass
+
+def _detect_scenes_child(connection, video_file, user_commands, score_cache_dir):
+    # In-process detection runs in its own process, so Cancel can stop it as well
+    try:
+        connection.send((True, detect_scenes_api(video_file, user_commands, score_cache_dir)))
+    except Exception as e:
+        connection.send((False, str(e)))
+
+class CSVtoJSON(tk.Tk):
+    def __init__(self):
+        super().__init__()
+
+        self.title("PySceneDetect GUI and CSV to JSON file with metadata")
+        self.geometry("600x850")
+
+        # Video file selection
+        self.video_file = tk.StringVar()
+        tk.Label(self, text="Select Video File:").pack(pady=5)
+        tk.Entry(self, textvariable=self.video_file, width=50).pack(pady=5)
+        tk.Button(self, text="Browse Video", command=self.select_video_file).pack(pady=5)
+
+        # Options
+        self.split_video = tk.BooleanVar()
+        self.split_accurate = tk.BooleanVar()
+        self.save_images = tk.BooleanVar()
+        self.fast_mode = tk.BooleanVar()
+        self.sample_every = tk.IntVar(value=4)
+        self.start_seconds = tk.IntVar(value=0)
+        self.min_scene_length = tk.IntVar(value=1)
+        self.threshold = tk.DoubleVar(value=27.0)
+        # Off by default: only the scenedetect command reports frames/s and the time left
+        self.reuse_scores = tk.BooleanVar(value=False)
+
+        # Split Video copies the streams, so each scene file starts at the keyframe before its cut;
+        # the frame-accurate option re-encodes instead
+        split_frame = tk.Frame(self)
+        split_frame.pack(pady=5)
+        tk.Checkbutton(split_frame, text="Split Video", variable=self.split_video).pack(side=tk.LEFT)
+        tk.Checkbutton(split_frame, text="Frame-accurate (re-encode)", variable=self.split_accurate).pack(side=tk.LEFT)
+        tk.Checkbutton(self, text="Save Images", variable=self.save_images).pack(pady=5)
+
+        # Fast mode only analyses every Nth frame of the (already downscaled) detection stream
+        fast_frame = tk.Frame(self)
+        fast_frame.pack(pady=5)
+        tk.Checkbutton(fast_frame, text="Fast mode, analyse every Nth frame:", variable=self.fast_mode).pack(side=tk.LEFT)
+        tk.Entry(fast_frame, textvariable=self.sample_every, width=5).pack(side=tk.LEFT)
+
+        tk.Label(self, text="Skip first N seconds (time --start):").pack(pady=5)
+        tk.Entry(self, textvariable=self.start_seconds).pack(pady=5)
+
+        tk.Label(self, text="Minimum length of any scene (--min-scene-len):").pack(pady=5)
+        tk.Entry(self, textvariable=self.min_scene_length).pack(pady=5)
+
+        tk.Label(self, text="Content threshold (detect-content --threshold):").pack(pady=5)
+        tk.Entry(self, textvariable=self.threshold).pack(pady=5)
+
+        # Frame scores are saved next to the video, so trying another threshold or
+        # minimum scene length does not decode the whole video again
+        tk.Checkbutton(self, text="Reuse cached frame scores (no frames/s or time left shown)", variable=self.reuse_scores).pack(pady=5)
+
+        # Buttons. Process adds the video to the queue, so the next file can be
+        # chosen while one is running; Cancel stops the running video only.
+        button_frame = tk.Frame(self)
+        button_frame.pack(pady=20)
+        tk.Button(button_frame, text="Process", command=self.process).pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.LEFT, padx=10)
+        tk.Button(button_frame, text="Close", command=self.close).pack(side=tk.LEFT, padx=10)
+
+        # Progress of the running video and the list of queued videos
+        self.progress = ttk.Progressbar(self, length=500, mode="determinate")
+        self.progress.pack(pady=5)
+        self.progress_text = tk.StringVar(value="Idle")
+        tk.Label(self, textvariable=self.progress_text).pack(pady=5)
+        self.queue_list = tk.Listbox(self, width=80, height=6)
+        self.queue_list.pack(pady=5)
+
+        # Videos are processed one at a time by a background thread. It never touches the
+        # widgets itself but posts events, which the Tk main loop picks up in poll_events.
+        self.jobs = queue.Queue()
+        self.events = queue.Queue()
+        self.job_files = []
+        self.child = None
+        self.cancel_requested = threading.Event()
+        threading.Thread(target=self.worker, daemon=True).start()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.after(100, self.poll_events)
+
+    def select_video_file(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Video Files", "*.mp4 *.avi *.mkv *.mov")])
+        if file_path:
+            self.video_file.set(file_path)
+
+    def process(self):
+        video_file = self.video_file.get()
+        if not video_file:
+            messagebox.showerror("Error", "Please select a video file.")
+            return
+
+        # Check ffmpeg and ffprobe availability
+        if not check_ffmpeg_ffprobe():
+            messagebox.showerror("Error", "ffmpeg or ffprobe is unavailable. Please check if their path has been added to the Environment Variables.")
+            self.quit()
+            return
+
+        try:
+            # Check write permissions for the output directory
+            output_dir = os.path.dirname(video_file)
+            if not os.access(output_dir, os.W_OK):
+                raise PermissionError(f"No write permission to the directory: {output_dir}")
+        except PermissionError as e:
+            messagebox.showerror("Permission Error", str(e))
+            return
+
+        # An empty or non-numeric entry raises TclError when it is read
+        for label, variable in (("Fast mode N", self.sample_every), ("Skip first N seconds", self.start_seconds),
+                                ("Minimum length of any scene", self.min_scene_length), ("Content threshold", self.threshold)):
+            try:
+                variable.get()
+            except tk.TclError:
+                messagebox.showerror("Error", f"{label} must be a number.")
+                return
+
+        # The settings are read now, so changing them for the next video does not affect this one
+        # Scene images and videos are saved from the JSON clip list afterwards, whichever way the scenes were detected
+        job = {"video_file": video_file, "output_dir": output_dir, "save_images": self.save_images.get()}
+        if self.split_video.get():
+            job["split_mode"] = "encode" if self.split_accurate.get() else "copy"
+        fast = self.fast_mode.get() and self.sample_every.get() > 1
+        if self.reuse_scores.get() or fast:
+            # Detect in-process, from the cached frame scores when they are reused. Fast mode always
+            # does, as only in-process detection moves cuts found on sampled frames to their exact frame.
+            job["user_commands"] = self.user_commands()
+            job["score_cache_dir"] = output_dir if self.reuse_scores.get() else None
+        else:
+            # Run PySceneDetect
+            job["command"] = self.pyscenedetect_command(video_file, output_dir)
+
+        self.job_files.append(video_file)
+        self.queue_list.insert(tk.END, self.queue_entry("Queued", video_file))
+        self.jobs.put((len(self.job_files) - 1, job))
+
+    def queue_entry(self, status, video_file):
+        return f"{status:<10} {video_file}"
+
+    def worker(self):
+        while True:
+            index, job = self.jobs.get()
+            self.cancel_requested.clear()
+            self.events.put(("status", index, "Running"))
+            try:
+                if "command" in job:
+                    self.run_pyscenedetect(job["command"])
+                    clips = None
+                else:
+                    clips = self.detect_in_child(job)
+
+                # Convert CSV to JSON with metadata. Cancel only kills child processes, so the
+                # flag is also checked between the stages and before reporting success.
+                self.check_cancelled()
+                json_file = convert_csv_to_json(job["video_file"], job["output_dir"], probe_cache=False, clips=clips)
+                self.check_cancelled()
+                if job["save_images"]:
+                    self.save_images_in_one_pass(json_file)
+                    self.check_cancelled()
+                if "split_mode" in job:
+                    self.split_in_parallel(json_file, job["split_mode"])
+                    self.check_cancelled()
+                self.events.put(("done", index, "Done", None))
+            except JobCancelled:
+                self.events.put(("done", index, "Cancelled", None))
+            except Exception as e:
+                self.events.put(("done", index, "Failed", f"Error occurred: {str(e)}"))
+
+    def check_cancelled(self):
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def poll_events(self):
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "status":
+                _, index, status = event
+                self.set_status(index, status)
+                self.progress.stop()
+                self.progress.config(mode="determinate", value=0)
+                self.progress_text.set(f"Processing {os.path.basename(self.job_files[index])}")
+            elif kind == "busy":
+                # In-process detection and saving images do not report progress
+                _, text = event
+                self.progress.config(mode="indeterminate")
+                self.progress.start(20)
+                self.progress_text.set(text)
+            elif kind == "progress":
+                _, done, total, fps, eta = event
+                self.progress.config(mode="determinate", maximum=total, value=done)
+                self.progress_text.set(f"{done}/{total} frames, {fps} frames/s, ETA {eta}")
+            elif kind == "done":
+                _, index, status, error = event
+                self.set_status(index, status)
+                self.progress.stop()
+                self.progress.config(mode="determinate", value=0)
+                self.progress_text.set(f"{status}: {os.path.basename(self.job_files[index])}. JSON files are saved next to the videos.")
+                if error:
+                    messagebox.showerror("Error", error)
+        self.after(100, self.poll_events)
+
+    def set_status(self, index, status):
+        self.queue_list.delete(index)
+        self.queue_list.insert(index, self.queue_entry(status, self.job_files[index]))
+
+    def cancel(self):
+        self.cancel_requested.set()
+        child = self.child
+        if child is not None:
+            child.kill()
+
+    def close(self):
+        self.cancel()
+        self.quit()
+
+    def user_commands(self):
+        # The GUI settings as PySceneDetect command line options
+        commands = ["--min-scene-len", f"{self.min_scene_length.get()}s"]
+        if self.fast_mode.get() and self.sample_every.get() > 1:
+            commands += ["--frame-skip", str(self.sample_every.get() - 1)]
+        commands += ["detect-content", "--threshold", str(self.threshold.get())]
+        if self.start_seconds.get() > 0:
+            commands += ["time", "--start", f"{self.start_seconds.get()}s"]
+        return commands
+
+    def pyscenedetect_command(self, video_file, output_dir):
+        # Construct the command for PySceneDetect
+        # Only used without fast mode, see process
+        cmd = ["scenedetect", "--input", video_file, "--output", output_dir, "--min-scene-len", f"{self.min_scene_length.get()}s"]
+
+        cmd += ["detect-content", "--threshold", str(self.threshold.get()), "list-scenes"]
+
+        if self.start_seconds.get() > 0:
+            cmd += ["time", "--start", f"{self.start_seconds.get()}s"]
+
+        return cmd
+
+    def run_pyscenedetect(self, cmd):
+        # Print the command for debugging purposes
+        print(f"Running command: {subprocess.list2cmdline(cmd)}")
+
+        # The progress bar is written to stderr and redrawn with \r; everything else is
+        # passed on to the CMD window
+        self.child = subprocess.Popen(cmd, stderr=subprocess.PIPE)
+        pending = b""
+        while True:
+            chunk = self.child.stderr.read1(4096)
+            if not chunk:
+                break
+            *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+            for line in lines:
+                line = line.decode("utf-8", errors="replace")
+                match = PROGRESS_PATTERN.search(line)
+                if match:
+                    done, total, eta, fps = match.groups()
+                    self.events.put(("progress", int(done), int(total), fps, eta))
+                elif line.strip():
+                    print(line)
+        returncode = self.child.wait()
+        self.child = None
+
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+    def detect_in_child(self, job):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_detect_scenes_child, args=(sender, job["video_file"], job["user_commands"], job["score_cache_dir"]), daemon=True)
+        self.events.put(("busy", "Detecting scenes in-process (no progress reported)..."))
+        process.start()
+        self.child = process
+        sender.close()
+        try:
+            ok, result = receiver.recv()
+        except (EOFError, OSError):
+            # The process ended without an answer: stopped by Cancel, or it crashed
+            ok, result = False, "Scene detection stopped unexpectedly."
+        process.join()
+        self.child = None
+
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def save_images_in_one_pass(self, json_file):
+        # The first and last frame of every scene come from one sequential ffmpeg pass instead of
+        # scenedetect's save-images, which seeks once per scene. The ffmpeg process is kept in
+        # self.child so Cancel can stop it.
+        self.events.put(("busy", "Saving scene images..."))
+        try:
+            save_scene_images_from_json(json_file, started=self.set_child)
+        except Exception:
+            if self.cancel_requested.is_set():
+                raise JobCancelled()
+            raise
+        finally:
+            self.child = None
+
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def split_in_parallel(self, json_file, mode):
+        # Several ffmpeg processes export the scenes at once instead of scenedetect's split-video,
+        # which encodes one scene after another. Cancel kills them through cancel_requested.
+        self.events.put(("busy", f"Splitting scenes ({mode})..."))
+        try:
+            split_video_from_json(json_file, mode=mode, cancel=self.cancel_requested)
+        except Exception:
+            if self.cancel_requested.is_set():
+                raise JobCancelled()
+            raise
+
+    def set_child(self, process):
+        self.child = process
+
+if __name__ == "__main__":
+    # Needed for the detection process when running as a pyinstaller .exe
+    multiprocessing.freeze_support()
+    app = CSVtoJSON()
+    app.mainloop()
@@ -0,0 +1,187 @@
+"""Benchmark the CMD_SceneDetect_to_EDIUS_FCP7XML pipeline on generated test media.
+
+Test clips are generated locally with ffmpeg lavfi sources joined by hard cuts at known
+frames, for every combination of frame size, frame rate and audio channel count. Each
+pipeline stage is timed on every clip and the results, with peak RSS and cut accuracy,
+are written as JSON.
+
+    python benchmarks/benchmark_pipeline.py --work_dir bench --sizes 640x360,1920x1080 --rates 25,30000/1001 --channels 2,8
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import CMD_SceneDetect_to_EDIUS_FCP7XML as pipeline
+from edius_core.detection import detect_scenes_api
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Visually distinct sources, used in turn for the segments of a test clip
+SOURCES = ["testsrc", "smptehdbars", "color=c=red", "smptebars", "rgbtestsrc", "color=c=navy", "yuvtestsrc", "color=c=olive"]
+
+# Segment lengths in frames, repeated until the clip is long enough
+SEGMENT_FRAMES = [90, 150, 60, 120, 45, 200]
+
+def make_test_clip(path, size, rate, channels, total_frames):
+    """Generate a clip of hard-cut segments and return the frame numbers of the cuts."""
+    segments = []
+    while sum(segments) < total_frames:
+        segments.append(SEGMENT_FRAMES[len(segments) % len(SEGMENT_FRAMES)])
+
+    command = [pipeline.find_tool("ffmpeg") or "ffmpeg", "-v", "error", "-y"]
+    filters = []
+    for i, frames in enumerate(segments):
+        source = SOURCES[i % len(SOURCES)]
+        separator = ":" if "=" in source else "="
+        command += ["-f", "lavfi", "-i", f"{source}{separator}size={size}:rate={rate}"]
+        filters.append(f"[{i}:v]trim=end_frame={frames},setpts=PTS-STARTPTS[v{i}]")
+    filters.append("".join(f"[v{i}]" for i in range(len(segments))) + f"concat=n={len(segments)}:v=1:a=0[v]")
+
+    # One sine tone per audio channel, as uncompressed PCM so any channel count fits in a .mov
+    duration = float(sum(segments) / Fraction(rate))
+    tones = "|".join(f"0.2*sin({220 * (channel + 1)}*2*PI*t)" for channel in range(channels))
+    command += ["-f", "lavfi", "-i", f"aevalsrc={tones}:s=48000:d={duration}"]
+    command += ["-filter_complex", ";".join(filters), "-map", "[v]", "-map", f"{len(segments)}:a", "-c:a", "pcm_s16le"]
+    command += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path]
+    subprocess.run(command, check=True)
+
+    cuts = []
+    for frames in segments[:-1]:
+        cuts.append((cuts[-1] if cuts else 0) + frames)
+    return cuts
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_case(video_file, output_dir, engine, user_commands, verbose):
+    """Time every pipeline stage on one clip. Runs in its own process so peak RSS is per case."""
+    if not verbose:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+
+    stages = {}
+    def timed(name, function, *args, **kwargs):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = function(*args, **kwargs)
+        stages[name] = {
+            "wall_s": round(time.perf_counter() - wall, 4),
+            "cpu_s": round(time.process_time() - cpu, 4),
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        }
+        return result
+
+    os.makedirs(output_dir, exist_ok=True)
+    pipeline.find_tool.cache_clear()
+    timed("tool_check", pipeline.check_ffmpeg_ffprobe)
+    video_info = timed("ffprobe", pipeline.extract_video_info, video_file)
+    if engine in ("api", "numpy", "keyframes"):
+        clips = timed("detection", detect_scenes_api, video_file, user_commands, engine=engine)
+    else:
+        timed("detection", pipeline.run_pyscenedetect, video_file, output_dir, user_commands)
+        clips = None
+    json_file = timed("csv_to_json", pipeline.convert_csv_to_json, video_file, output_dir, False, clips, video_info=video_info)
+    xml_file = os.path.splitext(json_file)[0] + ".xml"
+    timed("json_to_xml", pipeline.convert_json_to_xml, json_file, xml_file)
+
+    with open(json_file, 'r') as file:
+        detected = [clip["start"] for clip in json.load(file)["clips"][1:]]
+    return {
+        "stages": stages,
+        "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "detected_cuts": detected,
+        "xml_bytes": os.path.getsize(xml_file),
+    }
+
+def tool_version(command):
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        return result.stdout.splitlines()[0].strip() if result.stdout else None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scene detection to EDIUS XML pipeline on generated test media.")
+    parser.add_argument("--work_dir", default="benchmark_work", help="Directory for the generated clips and pipeline output")
+    parser.add_argument("--results", help="Path of the JSON results file (default: <work_dir>/benchmark_results.json)")
+    parser.add_argument("--sizes", default="640x360,1920x1080", help="Comma separated frame sizes")
+    parser.add_argument("--rates", default="25,30000/1001", help="Comma separated frame rates")
+    parser.add_argument("--channels", default="2,8", help="Comma separated audio channel counts (at least 1)")
+    parser.add_argument("--frames", type=int, default=1500, help="Approximate length of each test clip in frames")
+    parser.add_argument("--engines", default="cli", help="Comma separated detection engines to run: cli, api, numpy, keyframes")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the pipeline stages")
+    parser.add_argument('user_commands', nargs=argparse.REMAINDER, help="Additional PySceneDetect commands")
+    args = parser.parse_args()
+    if args.user_commands[:1] == ["--"]:
+        args.user_commands = args.user_commands[1:]
+
+    channel_counts = [int(value) for value in args.channels.split(",")]
+    if min(channel_counts) < 1:
+        print("Error: every test clip needs at least one audio channel.")
+        exit(1)
+
+    if not pipeline.check_ffmpeg_ffprobe():
+        print("Error: ffmpeg and/or ffprobe are not installed or not found in PATH.")
+        exit(1)
+
+    media_dir = os.path.join(args.work_dir, "media")
+    os.makedirs(media_dir, exist_ok=True)
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": tool_version([pipeline.find_tool("ffmpeg"), "-version"]),
+            "scenedetect": tool_version(["scenedetect", "version"]),
+        },
+        "cases": [],
+    }
+
+    print(f"{'Case':<28} {'Engine':<9} " + " ".join(f"{name:>11}" for name in ("tool_check", "ffprobe", "detection", "csv_to_json", "json_to_xml")) + f" {'RSS MB':>8} {'Cuts':>9}")
+    for size in args.sizes.split(","):
+        for rate in args.rates.split(","):
+            for channels in channel_counts:
+                name = f"{size}_{rate.replace('/', '-')}fps_{channels}ch"
+                video_file = os.path.join(media_dir, f"{name}.mov")
+                expected = make_test_clip(video_file, size, rate, channels, args.frames)
+                for engine in args.engines.split(","):
+                    output_dir = os.path.join(args.work_dir, f"{name}_{engine}")
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                        case = executor.submit(run_case, video_file, output_dir, engine, args.user_commands, args.verbose).result()
+                    detected = case.pop("detected_cuts")
+                    case.update({
+                        "name": name, "size": size, "rate": rate, "channels": channels, "engine": engine,
+                        "expected_cuts": expected,
+                        "cuts": {
+                            "exact": len(set(expected) & set(detected)),
+                            "missed": len(set(expected) - set(detected)),
+                            "extra": len(set(detected) - set(expected)),
+                        },
+                    })
+                    results["cases"].append(case)
+                    timings = " ".join(f"{case['stages'][stage]['wall_s']:>11.3f}" for stage in ("tool_check", "ffprobe", "detection", "csv_to_json", "json_to_xml"))
+                    peak = max(value for value in (case["stages"]["json_to_xml"]["peak_rss_mb"], case["children_peak_rss_mb"]) if value is not None) if resource else "n/a"
+                    print(f"{name:<28} {engine:<9} {timings} {peak:>8} {case['cuts']['exact']:>4}/{len(expected):<4}")
+
+    results_file = args.results or os.path.join(args.work_dir, "benchmark_results.json")
+    with open(results_file, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f"\nResults written to {results_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark the FCP7 XML writer against the audio channel count.
+
+Every clipitem carries one <link> per audio channel plus one for the video, and there is a
+clipitem per clip on the video track and on every audio track, so the XML grows with
+clips x (channels + 1)^2. This times the streamed writer, which stamps clipitems out of
+pre-rendered templates, against building every element of the same XML with create_xml_structure,
+checks both give the same text, and writes the results as JSON.
+
+    python benchmarks/benchmark_xml.py --clips 500 --channels 1,2,4,8,16
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from edius_core import fcp7xml
+
+def make_scene_data(clips, channels):
+    """Scene data as extract_video_info and convert_csv_to_json would give it, for a 25 fps HD video with 4 s scenes."""
+    return {
+        "sequence": {"name": "benchmark"},
+        "video": {"file": {"name": "benchmark.mxf", "pathurl": "D:/benchmark/benchmark.mxf", "media": {
+            "video": {
+                "duration": clips * 100,
+                "timecode": {"rate": {"ntsc": "FALSE", "timebase": 25}, "displayformat": "NDF", "first_timecode": "10:00:00:00"},
+                "samplecharacteristics": {"width": 1920, "height": 1080, "anamorphic": "FALSE", "pixelaspectratio": "Square"},
+            },
+            "audio": {"samplecharacteristics": {"depth": 24, "samplerate": "48000"}, "channelcount": channels},
+        }}},
+        "clips": [{"id": str(i), "start": (i - 1) * 100, "end": i * 100} for i in range(1, clips + 1)],
+    }
+
+def write_with_elements(data, out):
+    # The same XML, with every element of the document built by create_xml_structure
+    root = fcp7xml.create_xml_structure(data)
+    out.write('<?xml version="1.0" ?>\n<!DOCTYPE xmeml>\n')
+    fcp7xml._write_element(out, root, "")
+
+def best_time(function, data, repeat):
+    best = None
+    for _ in range(repeat):
+        out = io.StringIO()
+        start = time.perf_counter()
+        function(data, out)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FCP7 XML writer against the audio channel count.")
+    parser.add_argument("--clips", type=int, default=500, help="Number of clips (scenes) in the sequence")
+    parser.add_argument("--channels", default="1,2,4,8,16", help="Comma separated audio channel counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is reported")
+    parser.add_argument("--results", default="benchmark_xml_results.json", help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    results = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "clips": args.clips,
+        "cases": [],
+    }
+    print(f"{'Channels':>8} {'Clipitems':>10} {'Links':>10} {'XML MB':>8} {'Template s':>11} {'Elements s':>11} {'Speedup':>8}")
+    for channels in (int(value) for value in args.channels.split(",")):
+        data = make_scene_data(args.clips, channels)
+        template_s, template_xml = best_time(fcp7xml.write_xml_structure, data, args.repeat)
+        elements_s, elements_xml = best_time(write_with_elements, data, args.repeat)
+        if template_xml.rstrip("\n") != elements_xml.rstrip("\n"):
+            print(f"Error: the two writers give different XML for {channels} channel(s).")
+            exit(1)
+
+        clipitems = args.clips * (channels + 1)
+        case = {
+            "channels": channels,
+            "clipitems": clipitems,
+            "links": clipitems * (channels + 1),
+            "xml_bytes": len(template_xml.encode("utf-8")),
+            "template_s": round(template_s, 4),
+            "elements_s": round(elements_s, 4),
+        }
+        results["cases"].append(case)
+        print(f"{channels:>8} {clipitems:>10} {case['links']:>10} {case['xml_bytes'] / 1e6:>8.2f} {template_s:>11.3f} {elements_s:>11.3f} {elements_s / template_s:>7.1f}x")
+
+    with open(args.results, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f"\nResults written to {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Shared core of the PySceneDetect to EDIUS scripts: probing, scene detection, clip lists and the FCP7 XML writer.
+
+The command line script and both GUIs import from the submodules. Names can also be taken from
+the package itself (edius_core.extract_video_info); a submodule is only imported when one of its
+names is first used, so importing the package costs nothing.
+"""
+import importlib
+
+_EXPORTS = {
+    "probe": (
+        "PROBE_CACHE_NAME", "PROBE_ENTRIES", "find_tool", "check_ffmpeg_ffprobe", "probe_video", "extract_video_info",
+        "video_info_from_probe", "probe_keyframes", "run_tool_async", "check_ffmpeg_ffprobe_async", "probe_video_async",
+    ),
+    "detection": (
+        "API_ENGINE_OPTIONS", "SCORE_SETTINGS", "DEFAULT_THRESHOLD", "DEFAULT_MIN_SCENE_LEN", "DEFAULT_FADE_THRESHOLD",
+        "DEFAULT_ADAPTIVE_THRESHOLD", "DEFAULT_MIN_CONTENT_VAL", "DEFAULT_FRAME_WINDOW", "DETECTOR_METRICS", "NUMPY_BATCH_PIXELS",
+        "pyscenedetect_command", "run_pyscenedetect", "parse_user_commands", "timecode_to_frames", "file_fingerprint",
+        "compute_frame_scores_api", "compute_frame_scores_chunked", "ContentScorer", "compute_frame_scores_numpy", "load_frame_scores",
+        "load_frame_metrics", "scenes_from_scores", "scenes_from_fades", "scenes_from_adaptive", "scenes_for_detector", "refine_cuts",
+        "detect_scenes_multi", "detect_scenes_api", "detect_scenes_all",
+    ),
+    "framering": ("RING_SLOTS", "IntensityScorer", "compute_frame_metrics_ring"),
+    "coarse": ("COARSE_CANDIDATE_RATIO", "candidate_regions", "compute_frame_scores_coarse"),
+    "clips": (
+        "CLIPS_MAGIC", "CLIPS_HEADER", "iter_scene_csv", "read_scene_csv", "SceneCsvClips", "ClipStore",
+        "convert_csv_to_json", "load_scene_data", "combine_scene_data",
+    ),
+    "images": (
+        "SHEET_COLUMNS", "SHEET_ROWS", "SHEET_THUMB_WIDTH", "scene_image_frames", "scene_image_name", "save_scene_images",
+        "write_contact_sheet", "save_scene_images_from_json",
+    ),
+    "split": ("SPLIT_MODES", "SPLIT_COPY_WORKERS", "ENCODE_ARGS", "scene_file_name", "split_command", "split_video", "split_video_from_json"),
+    "fcp7xml": (
+        "DETECTOR_LAYOUTS", "convert_jsons_to_xml", "convert_clips_to_xml", "convert_json_to_xml", "sequence_sources",
+        "sequence_detectors", "FileRegistry", "ClipitemTemplates", "write_xml_structure", "create_xml_structure",
+        "add_sequence_header", "add_rate", "add_clipitem", "add_marker", "add_file_element", "add_video_format",
+        "add_audio_format", "add_audio_track", "add_link_elements",
+    ),
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module 'edius_core' has no attribute '{name}'")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,167 @@
+"""Clip lists: reading scenedetect CSV files, the array-backed ClipStore with its binary sidecar, and the -Scenes JSON files."""
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .probe import extract_video_info
+
+# Binary clip sidecar (--clip_format binary): this header with the clip count, then every start
+# frame and every end frame as int32, so the file can be memory-mapped instead of parsed
+CLIPS_MAGIC = b"EDCLIPS1"
+
+CLIPS_HEADER = struct.Struct("<8sQ")
+
+def iter_scene_csv(csv_file):
+    """Yield the clips of a PySceneDetect -Scenes.csv file one row at a time."""
+    with open(csv_file, mode='r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader)  # Skip the first line
+        headers = next(reader)  # Read the second line as headers
+        for row in reader:
+            row_dict = dict(zip(headers, row))
+            yield {
+                "id": row_dict["Scene Number"],
+                "start": int(row_dict["Start Frame"]) - 1,
+                "end": int(row_dict["End Frame"])
+            }
+
+def read_scene_csv(csv_file):
+    """Read the clips from a PySceneDetect -Scenes.csv file."""
+    if not os.path.exists(csv_file):
+        raise FileNotFoundError(f"CSV file '{csv_file}' does not exist.")
+    return list(iter_scene_csv(csv_file))
+
+class SceneCsvClips:
+    """The clips of a -Scenes.csv file, read again from the file on every iteration.
+
+    The XML writer goes over the clips once per track, so streaming from the CSV keeps
+    only one row in memory however many scenes there are.
+    """
+
+    def __init__(self, csv_file):
+        if not os.path.exists(csv_file):
+            raise FileNotFoundError(f"CSV file '{csv_file}' does not exist.")
+        self.csv_file = csv_file
+
+    def __iter__(self):
+        return iter_scene_csv(self.csv_file)
+
+class ClipStore:
+    """Scene start/end frames kept in two integer arrays instead of a dict per clip.
+
+    Iterating yields the {"id", "start", "end"} clips of the JSON format, one at a time, so
+    a store can be used wherever a list of clips is. ids are the 1-based clip numbers.
+    """
+
+    def __init__(self, starts=None, ends=None):
+        self.starts = array("i") if starts is None else starts
+        self.ends = array("i") if ends is None else ends
+
+    @classmethod
+    def from_clips(cls, clips):
+        store = cls()
+        for clip in clips:
+            store.starts.append(clip["start"])
+            store.ends.append(clip["end"])
+        return store
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a binary clip sidecar. Frames are only read from disk when they are used."""
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = CLIPS_HEADER.unpack_from(mapped)
+        if magic != CLIPS_MAGIC or len(mapped) != CLIPS_HEADER.size + 8 * count:
+            raise ValueError(f"'{path}' is not a valid clip file.")
+        values = memoryview(mapped)[CLIPS_HEADER.size:].cast("i")
+        if sys.byteorder == "big":
+            values = array("i", values)
+            values.byteswap()
+        return cls(values[:count], values[count:])
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(CLIPS_HEADER.pack(CLIPS_MAGIC, len(self)))
+            for values in (self.starts, self.ends):
+                values = array("i", values)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                values.tofile(file)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        index = range(len(self))[index]
+        return {"id": str(index + 1), "start": self.starts[index], "end": self.ends[index]}
+
+    def __iter__(self):
+        for i, (start, end) in enumerate(zip(self.starts, self.ends), start=1):
+            yield {"id": str(i), "start": start, "end": end}
+
+def convert_csv_to_json(video_file, output_dir, probe_cache=True, clips=None, suffix="", video_info=None, clip_format="json", detector_clips=None):
+    """Convert CSV output from PySceneDetect to JSON format. Clips detected in-process can be passed in instead.
+
+    suffix is added to the -Scenes JSON name, and video_info reuses metadata that was already extracted.
+    With clip_format="binary" the clips go to a -Scenes.clips sidecar named in the JSON's "clips_file".
+    detector_clips ({detector: clips}) are the scenes of other detectors run on the same decode,
+    kept under "detector_clips" (in -Scenes-<detector>.clips sidecars with clip_format="binary").
+    """
+    base_name = os.path.splitext(os.path.basename(video_file))[0]
+    csv_file = os.path.join(output_dir, f"{base_name}-Scenes.csv")
+    json_file = os.path.join(output_dir, f"{base_name}-Scenes{suffix}.json")
+
+    if clips is None:
+        clips = read_scene_csv(csv_file)
+
+    video_data = video_info or extract_video_info(video_file, output_dir if probe_cache else None)
+    combined_data = dict(video_data)
+    if clip_format == "binary":
+        clips_file = os.path.splitext(json_file)[0] + ".clips"
+        store = clips if isinstance(clips, ClipStore) else ClipStore.from_clips(clips)
+        store.save(clips_file)
+        combined_data["clips_file"] = os.path.basename(clips_file)
+        combined_data["clip_count"] = len(store)
+    else:
+        combined_data["clips"] = list(clips)
+
+    if detector_clips:
+        combined_data["detector_clips"] = {}
+        for detector, other_clips in detector_clips.items():
+            if clip_format == "binary":
+                other_file = f"{os.path.splitext(json_file)[0]}-{detector}.clips"
+                ClipStore.from_clips(other_clips).save(other_file)
+                combined_data["detector_clips"][detector] = os.path.basename(other_file)
+            else:
+                combined_data["detector_clips"][detector] = list(other_clips)
+
+    with open(json_file, mode='w') as file:
+        json.dump(combined_data, file, indent=4)
+
+    return json_file  # Return the path of the JSON file for further processing
+
+def load_scene_data(json_file_path):
+    """Load a -Scenes JSON file. Clips kept in a binary sidecar are memory-mapped as a ClipStore."""
+    with open(json_file_path, 'r') as json_file:
+        data = json.load(json_file)
+    json_dir = os.path.dirname(os.path.abspath(json_file_path))
+    if "clips_file" in data:
+        data["clips"] = ClipStore.load(os.path.join(json_dir, data["clips_file"]))
+    for detector, other_clips in data.get("detector_clips", {}).items():
+        if isinstance(other_clips, str):
+            data["detector_clips"][detector] = ClipStore.load(os.path.join(json_dir, other_clips))
+    return data
+
+def combine_scene_data(scene_data, name):
+    """Put the scene data of several videos into one multi-source sequence, in the given order."""
+    sources = []
+    for data in scene_data:
+        source = {"video": data["video"], "clips": data["clips"]}
+        if data.get("detector_clips"):
+            source["detector_clips"] = data["detector_clips"]
+        sources.append(source)
+    return {"sequence": {"name": name}, "sources": sources}
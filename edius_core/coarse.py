@@ -0,0 +1,83 @@
+"""Coarse-to-fine detection: score only the keyframes, then decode at full frame rate just around the likely cuts."""
+from .detection import _numpy_decode_command, compute_frame_scores_numpy, timecode_to_frames
+from .probe import probe_keyframes
+
+# A keyframe that scores at least this fraction of the detect-content threshold against the previous
+# keyframe marks the frames between them as a candidate region. Below 1 so that a cut whose two sides
+# look alike at the keyframes is still decoded in full.
+COARSE_CANDIDATE_RATIO = 0.5
+
+def candidate_regions(keyframes, key_scores, start, end, candidate_threshold):
+    """Return the merged (first, last) frame ranges to decode in full.
+
+    A candidate region runs from a keyframe to the next keyframe when that one scores at least
+    candidate_threshold. The frames from start to the first keyframe in range, and from the
+    last keyframe to end, cannot be judged from keyframes and are always decoded.
+    """
+    inside = [frame for frame in keyframes if start < frame < end]
+    if not inside:
+        return [(start, end - 1)]
+
+    regions = [(start, inside[0])]
+    scores = dict(zip(keyframes, key_scores))
+    for previous, frame in zip(inside, inside[1:]):
+        if scores[frame] >= candidate_threshold:
+            regions.append((previous, frame))
+    regions.append((inside[-1], end - 1))
+
+    merged = []
+    for first, last in regions:
+        if merged and first <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+def compute_frame_scores_coarse(video_file, settings, candidate_threshold):
+    """Score a video's frames like compute_frame_scores_numpy, decoding most of it only at its keyframes.
+
+    The keyframes come from ffprobe's packet index and are decoded alone (ffmpeg -skip_frame nokey),
+    which costs a small part of a full decode for long-GOP media. Each keyframe is scored against
+    the previous one, and only the candidate regions (see candidate_regions) are decoded at full
+    frame rate to place the cuts exactly. Frames outside them are left unscored (None), which
+    scenes_from_scores skips. --frame-skip is not used: the regions are always scored in full.
+    """
+    fine_settings = {key: value for key, value in settings.items() if key in ("luma_only", "kernel_size", "downscale")}
+    fps = _numpy_decode_command(video_file, fine_settings, keyframes_only=True)[1]
+    keyframes, frame_count = probe_keyframes(video_file, fps)
+
+    start = timecode_to_frames(settings["start"], fps) if "start" in settings else 0
+    if "end" in settings:
+        end = timecode_to_frames(settings["end"], fps)
+    elif "duration" in settings:
+        end = start + timecode_to_frames(settings["duration"], fps)
+    else:
+        end = None
+
+    key_scores = compute_frame_scores_numpy(video_file, fine_settings, keyframes_only=True)["scores"]
+    if len(keyframes) < 2 or len(key_scores) != len(keyframes):
+        # Streams where the decoder output does not match the packet index are decoded in full
+        print(f"Keyframe index of '{video_file}' is not usable ({len(keyframes)} keyframes, {len(key_scores)} decoded), decoding every frame")
+        full_settings = {key: value for key, value in settings.items() if key != "frame_skip"}
+        return compute_frame_scores_numpy(video_file, full_settings)
+
+    regions = candidate_regions(keyframes, key_scores, start, end if end is not None else frame_count, candidate_threshold)
+    scores = []
+    decoded = 0
+    for i, (first, last) in enumerate(regions):
+        region_settings = dict(fine_settings, start=str(first))
+        # The last region of a whole video runs to the real end, whatever the packet count said
+        if i < len(regions) - 1 or end is not None:
+            region_settings["end"] = str(last + 1)
+        region = compute_frame_scores_numpy(video_file, region_settings)
+        # The first frame of a region is only the reference for the next one, unless the scores start there
+        region_scores = region["scores"]
+        if first != start:
+            region_scores = [None] + region_scores[1:]
+        scores.extend([None] * (first - start - len(scores)))
+        scores[first - start:] = region_scores
+        decoded += len(region["scores"])
+
+    total = len(scores)
+    print(f"Coarse-to-fine: {len(keyframes)} keyframes, {len(regions)} region(s), {decoded} of {total} frames decoded in full ({decoded / max(total, 1):.0%})")
+    return {"fps": fps, "start_frame": start, "end_frame": start + total, "scores": scores}
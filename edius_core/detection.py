@@ -0,0 +1,677 @@
+"""Scene detection: the scenedetect command, and in-process per-frame scores (scenedetect API or NumPy) cut into clips."""
+import functools
+import hashlib
+import json
+import os
+import subprocess
+from fractions import Fraction
+
+from .probe import _probe_cache_key, find_tool, probe_video
+
+# PySceneDetect CLI options understood by the in-process (--engine api and numpy) detection,
+# per command (None = global options before the first command). A value of None marks a flag.
+API_ENGINE_OPTIONS = {
+    None: {"-m": "min_scene_len", "--min-scene-len": "min_scene_len", "-d": "downscale", "--downscale": "downscale",
+           "-fs": "frame_skip", "--frame-skip": "frame_skip"},
+    "time": {"-s": "start", "--start": "start", "-e": "end", "--end": "end", "-d": "duration", "--duration": "duration"},
+    "detect-content": {"-t": "threshold", "--threshold": "threshold", "-m": "min_scene_len", "--min-scene-len": "min_scene_len",
+                       "-l": None, "--luma-only": None, "-k": "kernel_size", "--kernel-size": "kernel_size"},
+    "detect-threshold": {"-t": "fade_threshold", "--threshold": "fade_threshold", "-f": "fade_bias", "--fade-bias": "fade_bias",
+                         "-m": "fade_min_scene_len", "--min-scene-len": "fade_min_scene_len"},
+    "detect-adaptive": {"-t": "adaptive_threshold", "--threshold": "adaptive_threshold", "-c": "min_content_val", "--min-content-val": "min_content_val",
+                        "-f": "frame_window", "--frame-window": "frame_window", "-m": "adaptive_min_scene_len", "--min-scene-len": "adaptive_min_scene_len"},
+    "list-scenes": {},
+}
+
+# Settings that change the per-frame content scores. Threshold and min-scene-len only
+# change how the scores are cut into scenes, so they are not part of the score cache key.
+SCORE_SETTINGS = ("start", "end", "duration", "luma_only", "kernel_size", "downscale", "frame_skip")
+
+# Same defaults as the scenedetect command line
+DEFAULT_THRESHOLD = 27.0
+
+DEFAULT_MIN_SCENE_LEN = "0.6s"
+
+DEFAULT_FADE_THRESHOLD = 12.0
+
+DEFAULT_ADAPTIVE_THRESHOLD = 3.0
+
+DEFAULT_MIN_CONTENT_VAL = 15.0
+
+DEFAULT_FRAME_WINDOW = 2
+
+# Detectors --engine numpy can run, and the per-frame metric each one cuts into scenes.
+# AdaptiveDetector works on ContentDetector's scores, so both share one metric.
+DETECTOR_METRICS = {"content": "content", "threshold": "intensity", "adaptive": "content"}
+
+# --engine numpy scores frames in batches of about this many pixels (64 frames of a 256x144 proxy),
+# which bounds the memory of the temporary arrays whatever the frame size
+NUMPY_BATCH_PIXELS = 1 << 21
+
+def pyscenedetect_command(video_file, output_dir, user_commands):
+    return ["scenedetect", "-i", video_file, "-o", output_dir] + user_commands + ["detect-content", "list-scenes"]
+
+def run_pyscenedetect(video_file, output_dir, user_commands):
+    """Run PySceneDetect with the provided commands."""
+    command = pyscenedetect_command(video_file, output_dir, user_commands)
+    print("Running command:", " ".join(command))
+    try:
+        subprocess.run(command, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error running PySceneDetect: {e}") from e
+
+def parse_user_commands(user_commands):
+    """Read the PySceneDetect CLI options that the in-process detection supports into a settings dict."""
+    settings = {}
+    command = None
+    args = list(user_commands)
+    while args:
+        arg = args.pop(0)
+        if arg in API_ENGINE_OPTIONS:
+            command = arg
+            if arg.startswith("detect-"):
+                # The detectors in the order they were given, e.g. ["threshold", "content"]
+                settings.setdefault("detectors", []).append(arg[len("detect-"):])
+            continue
+        name, _, value = arg.partition("=")
+        options = API_ENGINE_OPTIONS[command]
+        if not arg.startswith("-"):
+            raise ValueError(f"Command '{arg}' is not supported by --engine api or numpy, use --engine cli instead.")
+        if name not in options:
+            where = f"the '{command}' command" if command else "PySceneDetect"
+            raise ValueError(f"Option '{arg}' for {where} is not supported by --engine api or numpy, use --engine cli instead.")
+        key = options[name]
+        if key is None:
+            settings["luma_only"] = True
+            continue
+        if not value:
+            if not args:
+                raise ValueError(f"Option '{name}' needs a value.")
+            value = args.pop(0)
+        settings[key] = value
+    return settings
+
+def timecode_to_frames(value, fps):
+    """Convert a PySceneDetect timecode (frames "15", seconds "2s"/"2.5" or "HH:MM:SS[.nnn]") to a frame count."""
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    if value.endswith("s"):
+        seconds = float(value[:-1])
+    elif ":" in value:
+        hours, minutes, secs = value.split(":")
+        seconds = int(hours) * 3600 + int(minutes) * 60 + float(secs)
+    else:
+        seconds = float(value)
+    return round(seconds * fps)
+
+def file_fingerprint(video_file, sample_size=1 << 20):
+    """Hash the size and the first, middle and last MiB of a file, enough to identify media without reading all of it."""
+    size = os.path.getsize(video_file)
+    digest = hashlib.sha1(str(size).encode())
+    with open(video_file, 'rb') as file:
+        for offset in sorted({0, max(0, size // 2 - sample_size // 2), max(0, size - sample_size)}):
+            file.seek(offset)
+            digest.update(file.read(sample_size))
+    return digest.hexdigest()
+
+def _open_video_api(video_file):
+    try:
+        from scenedetect import open_video
+    except ImportError as e:
+        raise RuntimeError("--engine api needs the scenedetect Python package (pip install scenedetect[opencv]).") from e
+    return open_video(video_file)
+
+def _content_scene_manager(settings):
+    # SceneManager with a ContentDetector that records every processed frame's score
+    from scenedetect import SceneManager, StatsManager, ContentDetector
+
+    detector_args = {}
+    if "kernel_size" in settings:
+        detector_args["kernel_size"] = int(settings["kernel_size"])
+    if settings.get("luma_only"):
+        detector_args["luma_only"] = True
+
+    # The stats manager is given to the detector only: SceneManager refuses to combine
+    # one with frame skipping, but the detector just records the frames it processes.
+    stats_manager = StatsManager()
+    detector = ContentDetector(**detector_args)
+    scene_manager = SceneManager()
+    scene_manager.add_detector(detector)
+    detector.stats_manager = stats_manager
+    stats_manager.register_metrics(detector.get_metrics())
+    if "downscale" in settings:
+        scene_manager.auto_downscale = False
+        scene_manager.downscale = int(settings["downscale"])
+    return scene_manager, stats_manager, ContentDetector.FRAME_SCORE_KEY
+
+def compute_frame_scores_api(video_file, settings):
+    """Decode a video once with the scenedetect API and record the ContentDetector score of every frame."""
+    video = _open_video_api(video_file)
+    fps = float(video.frame_rate)
+    scene_manager, stats_manager, score_key = _content_scene_manager(settings)
+
+    if "start" in settings:
+        video.seek(timecode_to_frames(settings["start"], fps))
+    print(f"Detecting scenes in-process: {video_file}")
+    scene_manager.detect_scenes(
+        video,
+        end_time=timecode_to_frames(settings["end"], fps) if "end" in settings else None,
+        duration=timecode_to_frames(settings["duration"], fps) if "duration" in settings else None,
+        frame_skip=int(settings.get("frame_skip", 0)),
+    )
+
+    scene_list = scene_manager.get_scene_list(start_in_scene=True)
+    if not scene_list:
+        raise RuntimeError(f"No frames could be decoded from '{video_file}'.")
+    start_frame = scene_list[0][0].frame_num
+    end_frame = scene_list[-1][1].frame_num
+
+    # Frames skipped by --frame-skip have no score. The first frame has nothing to be
+    # compared with and scores 0.0 inside the detector, but is not written to the stats.
+    scores = []
+    for frame_num in range(start_frame, end_frame):
+        score = stats_manager.get_metrics(frame_num, [score_key])[0]
+        scores.append(None if score is None else float(score))
+    scores[0] = 0.0
+    return {"fps": fps, "start_frame": start_frame, "end_frame": end_frame, "scores": scores}
+
+def compute_frame_scores_chunked(video_file, settings, chunks):
+    """Score a long video as `chunks` time ranges decoded in parallel worker processes, then join the scores.
+
+    A frame's score only depends on that frame and the previously processed one, so every chunk
+    starts decoding one processed frame early and keeps only the scores of its own range. The
+    joined scores are the same as a serial run's, and so are the cuts derived from them, including
+    min-scene-len across chunk boundaries.
+    """
+    video = _open_video_api(video_file)
+    fps = float(video.frame_rate)
+    start = timecode_to_frames(settings["start"], fps) if "start" in settings else 0
+    if "end" in settings:
+        end = timecode_to_frames(settings["end"], fps)
+    elif "duration" in settings:
+        end = start + timecode_to_frames(settings["duration"], fps)
+    else:
+        end = video.duration.frame_num
+    del video
+
+    # Chunk boundaries stay on the --frame-skip grid so each chunk processes the same frames as a serial run
+    step = int(settings.get("frame_skip", 0)) + 1
+    bounds = sorted({start + round((end - start) * i / chunks / step) * step for i in range(chunks)})
+    ranges = list(zip(bounds, bounds[1:] + [end]))
+
+    jobs = []
+    for i, (chunk_start, chunk_end) in enumerate(ranges):
+        chunk_settings = {key: value for key, value in settings.items() if key not in ("start", "end", "duration")}
+        chunk_settings["start"] = str(max(start, chunk_start - step))
+        # The last chunk runs to the real end of the video, whatever the estimated length was
+        if i < len(ranges) - 1 or "end" in settings or "duration" in settings:
+            chunk_settings["end"] = str(chunk_end)
+        jobs.append(chunk_settings)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"Scoring {len(ranges)} chunks of '{video_file}' in parallel")
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        results = list(executor.map(compute_frame_scores_api, [video_file] * len(jobs), jobs))
+
+    scores = []
+    for i, ((chunk_start, chunk_end), result) in enumerate(zip(ranges, results)):
+        offset = chunk_start - result["start_frame"]
+        if offset < 0:
+            raise RuntimeError(f"Seeking to frame {chunk_start - step} of '{video_file}' landed on frame {result['start_frame']}.")
+        chunk_scores = result["scores"][offset:] if i == len(ranges) - 1 else result["scores"][offset:offset + chunk_end - chunk_start]
+        if i < len(ranges) - 1 and len(chunk_scores) != chunk_end - chunk_start:
+            raise RuntimeError(f"Decoding of '{video_file}' stopped early in the chunk starting at frame {chunk_start}.")
+        scores.extend(chunk_scores)
+    return {"fps": fps, "start_frame": start, "end_frame": results[-1]["end_frame"], "scores": scores}
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("--engine numpy needs the numpy package (pip install numpy).") from e
+    return numpy
+
+@functools.lru_cache(maxsize=None)
+def _hsv_tables():
+    # OpenCV's fixed-point 8-bit COLOR_BGR2HSV (H 0-179) as lookup tables: S by (max - min, max)
+    # and H by (numerator of the hue sector + 255, max - min), so a pixel costs two lookups
+    np = _import_numpy()
+    divisor = np.arange(256, dtype=np.int64)
+    divisor[0] = 1
+    sdiv = np.where(np.arange(256) > 0, np.rint((255 << 12) / divisor), 0).astype(np.int64)
+    hdiv = np.where(np.arange(256) > 0, np.rint((180 << 12) / (6 * divisor)), 0).astype(np.int64)
+    diff = np.arange(256)[:, None]
+    saturation = ((diff * sdiv[None, :] + (1 << 11)) >> 12).clip(0, 255).astype(np.uint8)
+    numerator = np.arange(-255, 5 * 255 + 1)[:, None]
+    hue = (numerator * hdiv[None, :] + (1 << 11)) >> 12
+    hue = np.where(hue < 0, hue + 180, hue).clip(0, 255).astype(np.uint8)
+    return saturation.ravel(), hue.ravel()
+
+def _rgb_to_hsv_numpy(np, frames):
+    # Same planes as ContentDetector's cv2.cvtColor, for a whole stack of frames at once
+    saturation, hue = _hsv_tables()
+    r, g, b = (frames[..., i].astype(np.int16) for i in range(3))
+    v = np.maximum(np.maximum(r, g), b)
+    diff = v - np.minimum(np.minimum(r, g), b)
+    s = saturation.take((diff.astype(np.int32) << 8) | v)
+    numerator = np.where(v == r, g - b, np.where(v == g, b - r + 2 * diff, r - g + 4 * diff))
+    h = hue.take(((numerator + 255).astype(np.int32) << 8) | diff)
+    return h, s, v.astype(np.uint8)
+
+def _read_frames(pipe, buffer):
+    # Fill a frame buffer from the pipe; returns the number of whole frames read (fewer at the end)
+    view = memoryview(buffer).cast("B")
+    filled = 0
+    while filled < len(view):
+        count = pipe.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled // buffer[0].nbytes
+
+class ContentScorer:
+    """ContentDetector's frame score for batches of consecutive RGB frames, computed with NumPy.
+
+    The HSV planes of the last frame are kept, so the first frame of the next batch is scored
+    against it. The very first frame scores 0, like in scenedetect.
+    """
+    def __init__(self, np, luma_only=False):
+        self.np = np
+        self.luma_only = luma_only
+        self.previous = None
+
+    def __call__(self, frames):
+        np = self.np
+        planes = _rgb_to_hsv_numpy(np, frames)
+        if self.luma_only:
+            planes = planes[2:]
+        pixels = float(frames.shape[1] * frames.shape[2])
+
+        # Mean absolute difference of each plane between consecutive scored frames
+        components = []
+        for index, plane in enumerate(planes):
+            plane = plane.astype(np.int16)
+            sums = np.abs(np.diff(plane, axis=0)).sum(axis=(1, 2))
+            first = np.abs(plane[0] - self.previous[index]).sum() if self.previous else 0
+            components.append(np.concatenate(([first], sums)) / pixels)
+        scores = (sum(components) / len(components)).tolist()
+        if not self.previous:
+            scores[0] = 0.0
+        self.previous = [plane[-1].astype(np.int16) for plane in planes]
+        return scores
+
+@functools.lru_cache(maxsize=32)
+def _video_stream(path, size, mtime_ns):
+    # One ffprobe per file version, however many short decodes refine_cuts and the coarse-to-fine regions start
+    return next((stream for stream in probe_video(path)["streams"] if stream["codec_type"] == "video"), None)
+
+# Part of the --engine numpy and keyframes score cache keys, so that scores of portrait videos cached
+# while the proxy was sized by the longer side are not reused
+NUMPY_PROXY_SIZING = "width"
+
+def _proxy_size(width, height, settings):
+    # Same proxy size as SceneManager: --downscale, or a factor for a frame about 256 pixels wide.
+    # Like scenedetect's compute_downscale_factor the factor comes from the width alone, also for portrait video.
+    if "downscale" in settings:
+        factor = int(settings["downscale"])
+    else:
+        factor = width / 256 if width >= 256 else 1
+    if factor > 1:
+        width, height = max(1, round(width / factor)), max(1, round(height / factor))
+    return width, height
+
+def _numpy_decode_command(video_file, settings, keyframes_only=False):
+    # ffmpeg command writing the detection proxy as raw RGB frames, with the frame rate, proxy size and first frame.
+    # keyframes_only decodes just the keyframes of the whole video, which skips nearly all decoding work.
+    video_stream = _video_stream(*_probe_cache_key(video_file))
+    if not video_stream:
+        raise ValueError("Video stream not found in the file.")
+    fps = float(Fraction(video_stream["r_frame_rate"]))
+    source_size = int(video_stream["width"]), int(video_stream["height"])
+    width, height = _proxy_size(*source_size, settings)
+
+    start_frame = timecode_to_frames(settings["start"], fps) if "start" in settings else 0
+    command = [find_tool("ffmpeg") or "ffmpeg", "-v", "error", "-nostdin"]
+    if keyframes_only:
+        start_frame = 0
+        command += ["-skip_frame", "nokey"]
+    elif start_frame:
+        # Half a frame early, so rounding of the seek time cannot skip the start frame
+        command += ["-ss", f"{(start_frame - 0.5) / fps:.6f}"]
+    command += ["-i", video_file, "-map", "0:v:0", "-vsync", "0"]
+    if "end" in settings and not keyframes_only:
+        command += ["-frames:v", str(timecode_to_frames(settings["end"], fps) - start_frame)]
+    elif "duration" in settings and not keyframes_only:
+        command += ["-frames:v", str(timecode_to_frames(settings["duration"], fps))]
+    if (width, height) != source_size:
+        command += ["-vf", f"scale={width}:{height}:flags=bilinear"]
+    command += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    return command, fps, width, height, start_frame
+
+def compute_frame_scores_numpy(video_file, settings, batch_pixels=NUMPY_BATCH_PIXELS, keyframes_only=False):
+    """Score every frame like ContentDetector, reading raw RGB frames from an ffmpeg pipe and scoring them with NumPy.
+
+    ffmpeg decodes and scales the frames to the same proxy size scenedetect would use, and
+    they are read into one reused buffer. The HSV planes and frame differences are computed
+    per batch of frames with array operations. Returns the same score data as
+    compute_frame_scores_api, so it works with the score cache and scenes_from_scores.
+
+    With keyframes_only only the keyframes of the whole video are decoded, and "scores" holds
+    each keyframe's score against the previous keyframe, in order (see probe_keyframes).
+    """
+    np = _import_numpy()
+    command, fps, width, height, start_frame = _numpy_decode_command(video_file, settings, keyframes_only)
+
+    # --frame-skip: only every step-th frame is scored, against the previous scored frame
+    step = int(settings.get("frame_skip", 0)) + 1
+    batch_frames = max(1, batch_pixels // (width * height))
+    buffer = np.empty((batch_frames * step, height, width, 3), dtype=np.uint8)
+    scorer = ContentScorer(np, bool(settings.get("luma_only")))
+    scores = []
+
+    print(f"Detecting scenes with NumPy{' (keyframes only)' if keyframes_only else ''}: {video_file}")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            count = _read_frames(process.stdout, buffer)
+            if not count:
+                break
+            batch = [None] * count
+            batch[::step] = scorer(buffer[:count:step])
+            scores.extend(batch)
+            if count < len(buffer):
+                break
+    finally:
+        process.stdout.close()
+        error = process.stderr.read().decode(errors="replace").strip()
+        process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on '{video_file}': {error}")
+    if not scores:
+        raise RuntimeError(f"No frames could be decoded from '{video_file}'.")
+    return {"fps": fps, "start_frame": start_frame, "end_frame": start_frame + len(scores), "scores": scores}
+
+def _scores_file(video_file, cache_dir, key_fields):
+    key_source = json.dumps(key_fields, sort_keys=True)
+    key = hashlib.sha1(key_source.encode()).hexdigest()[:16]
+    base_name = os.path.splitext(os.path.basename(video_file))[0]
+    return os.path.join(cache_dir, f"{base_name}-Scores-{key}.json")
+
+def _read_scores(scores_file):
+    if os.path.exists(scores_file):
+        try:
+            with open(scores_file, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Could not read frame scores '{scores_file}': {e}")
+    return None
+
+def _write_scores(scores_file, score_data):
+    try:
+        with open(scores_file, 'w') as file:
+            json.dump(score_data, file)
+    except OSError as e:
+        print(f"Could not write frame scores '{scores_file}': {e}")
+
+def load_frame_scores(video_file, settings, cache_dir=None, chunks=1, engine="api"):
+    """Return the per-frame scores for a video, from the stats sidecar in cache_dir when one matches.
+
+    With chunks > 1 the scores are computed by compute_frame_scores_chunked, which gives the
+    same scores, so both share one sidecar. engine="numpy" uses compute_frame_scores_numpy, and
+    engine="keyframes" compute_frame_scores_coarse, whose candidate regions depend on the threshold.
+    """
+    score_settings = {key: settings[key] for key in SCORE_SETTINGS if key in settings}
+    key_fields = {"file": file_fingerprint(video_file) if cache_dir else None, "settings": score_settings}
+    if engine == "numpy":
+        compute = compute_frame_scores_numpy
+        # ffmpeg decodes and scales slightly differently from OpenCV, so keep the scores apart
+        key_fields["engine"] = engine
+        key_fields["proxy"] = NUMPY_PROXY_SIZING
+    elif engine == "keyframes":
+        from .coarse import COARSE_CANDIDATE_RATIO, compute_frame_scores_coarse
+
+        candidate_threshold = float(settings.get("threshold", DEFAULT_THRESHOLD)) * COARSE_CANDIDATE_RATIO
+        compute = functools.partial(compute_frame_scores_coarse, candidate_threshold=candidate_threshold)
+        key_fields["engine"] = engine
+        key_fields["proxy"] = NUMPY_PROXY_SIZING
+        key_fields["candidate_threshold"] = candidate_threshold
+    elif chunks > 1:
+        compute = functools.partial(compute_frame_scores_chunked, chunks=chunks)
+    else:
+        compute = compute_frame_scores_api
+    if not cache_dir:
+        return compute(video_file, score_settings)
+
+    scores_file = _scores_file(video_file, cache_dir, key_fields)
+    score_data = _read_scores(scores_file)
+    if score_data is None:
+        score_data = compute(video_file, score_settings)
+        _write_scores(scores_file, score_data)
+    return score_data
+
+def load_frame_metrics(video_file, settings, metrics, cache_dir=None):
+    """Return {metric: score data} for the given DETECTOR_METRICS values, decoding the video once for all that are not cached.
+
+    The metrics are computed from one ffmpeg decode by compute_frame_metrics_ring. The content
+    scores are the same as compute_frame_scores_numpy's and share its sidecar.
+    """
+    from .framering import compute_frame_metrics_ring
+
+    score_settings = {key: settings[key] for key in SCORE_SETTINGS if key in settings}
+    fingerprint = file_fingerprint(video_file) if cache_dir else None
+    results = {}
+    scores_files = {}
+    for metric in metrics:
+        key_fields = {"file": fingerprint, "settings": score_settings, "engine": "numpy", "proxy": NUMPY_PROXY_SIZING}
+        if metric != "content":
+            key_fields["metric"] = metric
+        if cache_dir:
+            scores_files[metric] = _scores_file(video_file, cache_dir, key_fields)
+            score_data = _read_scores(scores_files[metric])
+            if score_data is not None:
+                results[metric] = score_data
+
+    missing = [metric for metric in metrics if metric not in results]
+    if missing:
+        for metric, score_data in compute_frame_metrics_ring(video_file, score_settings, missing).items():
+            results[metric] = score_data
+            if cache_dir:
+                _write_scores(scores_files[metric], score_data)
+    return results
+
+def scenes_from_scores(score_data, threshold=DEFAULT_THRESHOLD, min_scene_len=0):
+    """Cut per-frame scores into clips using ContentDetector's rules (flash filter in merge mode)."""
+    start_frame = score_data["start_frame"]
+    cuts = []
+    last_above = None
+    merge_enabled = False
+    merge_start = None
+    for frame_num, score in enumerate(score_data["scores"], start=start_frame):
+        if score is None:
+            continue
+        above_threshold = score >= threshold
+        if min_scene_len <= 0:
+            if above_threshold:
+                cuts.append(frame_num)
+            continue
+
+        if last_above is None:
+            last_above = frame_num
+        min_length_met = frame_num - last_above >= min_scene_len
+        if above_threshold:
+            last_above = frame_num
+        if merge_start is not None:
+            # Merging a burst of cuts until enough frames pass below the threshold
+            if min_length_met and not above_threshold and last_above - merge_start >= min_scene_len:
+                merge_start = None
+                cuts.append(last_above)
+        elif above_threshold:
+            if min_length_met:
+                merge_enabled = True
+                cuts.append(frame_num)
+            elif merge_enabled:
+                merge_start = frame_num
+
+    return _clips_from_cuts(start_frame, cuts, score_data["end_frame"])
+
+def _clips_from_cuts(start_frame, cuts, end_frame):
+    # A video without cuts is still one scene, like list-scenes does
+    boundaries = [start_frame] + cuts + [end_frame]
+    return [{"id": str(i), "start": start, "end": end} for i, (start, end) in enumerate(zip(boundaries, boundaries[1:]), start=1)]
+
+def scenes_from_fades(score_data, threshold=DEFAULT_FADE_THRESHOLD, fade_bias=0.0, min_scene_len=0):
+    """Cut per-frame mean intensities into clips using ThresholdDetector's rules: one cut between each fade out and the next fade in.
+
+    A frame is faded out while its mean pixel value is below threshold. The cut is placed
+    halfway through the dark part, moved towards the fade in by fade_bias (-1.0 to 1.0).
+    """
+    start_frame = score_data["start_frame"]
+    cuts = []
+    last_cut = start_frame
+    fade_type = fade_frame = None
+    for frame_num, value in enumerate(score_data["scores"], start=start_frame):
+        if value is None:
+            continue
+        dark = value < threshold
+        if fade_type is None:
+            fade_type, fade_frame = "out" if dark else "in", frame_num
+        elif fade_type == "in" and dark:
+            fade_type, fade_frame = "out", frame_num
+        elif fade_type == "out" and not dark:
+            if frame_num - last_cut >= min_scene_len:
+                cut = int((frame_num + fade_frame + int(fade_bias * (frame_num - fade_frame))) / 2)
+                if cut > (cuts[-1] if cuts else start_frame):
+                    cuts.append(cut)
+                last_cut = frame_num
+            fade_type, fade_frame = "in", frame_num
+    return _clips_from_cuts(start_frame, cuts, score_data["end_frame"])
+
+def scenes_from_adaptive(score_data, adaptive_threshold=DEFAULT_ADAPTIVE_THRESHOLD, min_content_val=DEFAULT_MIN_CONTENT_VAL,
+                         frame_window=DEFAULT_FRAME_WINDOW, min_scene_len=0):
+    """Cut per-frame content scores into clips using AdaptiveDetector's rules.
+
+    A frame is a cut when its score is at least min_content_val and adaptive_threshold times
+    the average score of the frame_window scored frames on either side, so fast camera moves
+    that raise every frame's score do not cut.
+    """
+    start_frame = score_data["start_frame"]
+    scored = [(frame_num, score) for frame_num, score in enumerate(score_data["scores"], start=start_frame) if score is not None]
+    cuts = []
+    last_cut = start_frame
+    for i in range(frame_window, len(scored) - frame_window):
+        frame_num, score = scored[i]
+        neighbours = scored[i - frame_window:i] + scored[i + 1:i + frame_window + 1]
+        average = sum(value for _, value in neighbours) / (2.0 * frame_window)
+        if abs(average) >= 0.00001:
+            ratio = min(score / average, 255.0)
+        else:
+            ratio = 255.0 if score >= min_content_val else 0.0
+        if ratio >= adaptive_threshold and score >= min_content_val and frame_num - last_cut >= min_scene_len:
+            cuts.append(frame_num)
+            last_cut = frame_num
+    return _clips_from_cuts(start_frame, cuts, score_data["end_frame"])
+
+def scenes_for_detector(detector, score_data, settings):
+    """Cut one detector's per-frame metric (see DETECTOR_METRICS) into clips with that detector's options from settings."""
+    fps = score_data["fps"]
+    min_scene_len = settings.get("min_scene_len", DEFAULT_MIN_SCENE_LEN)
+    if detector == "threshold":
+        return scenes_from_fades(score_data, float(settings.get("fade_threshold", DEFAULT_FADE_THRESHOLD)), float(settings.get("fade_bias", 0.0)),
+                                 timecode_to_frames(settings.get("fade_min_scene_len", min_scene_len), fps))
+    if detector == "adaptive":
+        return scenes_from_adaptive(score_data, float(settings.get("adaptive_threshold", DEFAULT_ADAPTIVE_THRESHOLD)),
+                                    float(settings.get("min_content_val", DEFAULT_MIN_CONTENT_VAL)), int(settings.get("frame_window", DEFAULT_FRAME_WINDOW)),
+                                    timecode_to_frames(settings.get("adaptive_min_scene_len", min_scene_len), fps))
+    return scenes_from_scores(score_data, float(settings.get("threshold", DEFAULT_THRESHOLD)), timecode_to_frames(min_scene_len, fps))
+
+def refine_cuts(video_file, clips, settings, engine="api"):
+    """Move cuts found on sampled frames (--frame-skip) to the exact frame by scoring the frames skipped before each cut."""
+    step = int(settings.get("frame_skip", 0)) + 1
+    if step == 1 or len(clips) < 2:
+        return clips
+
+    fine_settings = {key: value for key, value in settings.items() if key in ("luma_only", "kernel_size", "downscale")}
+    if engine == "numpy":
+        def window_scores(first, last):
+            score_data = compute_frame_scores_numpy(video_file, dict(fine_settings, start=str(first), end=str(last + 1)))
+            return dict(enumerate(score_data["scores"], start=score_data["start_frame"]))
+    else:
+        video = _open_video_api(video_file)
+        def window_scores(first, last):
+            scene_manager, stats_manager, score_key = _content_scene_manager(fine_settings)
+            video.seek(first)
+            scene_manager.detect_scenes(video, end_time=last + 1)
+            return {frame_num: stats_manager.get_metrics(frame_num, [score_key])[0] for frame_num in range(first + 1, last + 1)}
+
+    for previous, clip in zip(clips, clips[1:]):
+        # The scene changed somewhere after the previous sampled frame, up to the cut frame
+        cut = clip["start"]
+        scores = window_scores(cut - step, cut)
+        exact = max(range(cut - step + 1, cut + 1), key=lambda frame_num: scores.get(frame_num) or 0.0)
+        previous["end"] = clip["start"] = exact
+    return clips
+
+def detect_scenes_multi(video_file, user_commands, score_cache_dir=None, detectors=None):
+    """Run several detectors on one decode of a video. Returns {detector: clips in the JSON clip format}.
+
+    detectors defaults to the detect-content, detect-threshold and detect-adaptive commands in
+    user_commands (detect-content when there are none). The frames are decoded once by ffmpeg
+    into a shared-memory ring that one NumPy worker process per metric reads, see
+    compute_frame_metrics_ring. With --frame-skip the content and adaptive cuts are refined
+    to the exact frame; fade cuts lie halfway through the dark frames and are kept.
+    """
+    settings = parse_user_commands(user_commands)
+    detectors = list(dict.fromkeys(detectors or settings.get("detectors") or ["content"]))
+    unknown = [detector for detector in detectors if detector not in DETECTOR_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown detector '{unknown[0]}', choose from {', '.join(DETECTOR_METRICS)}.")
+
+    metrics = load_frame_metrics(video_file, settings, list(dict.fromkeys(DETECTOR_METRICS[detector] for detector in detectors)), score_cache_dir)
+    results = {}
+    for detector in detectors:
+        clips = scenes_for_detector(detector, metrics[DETECTOR_METRICS[detector]], settings)
+        results[detector] = clips if detector == "threshold" else refine_cuts(video_file, clips, settings, "numpy")
+    return results
+
+def detect_scenes_api(video_file, user_commands, score_cache_dir=None, chunks=1, engine="api", clip_source=None):
+    """Detect scenes in-process with the scenedetect Python API. Returns clips in the JSON clip format.
+
+    With a score_cache_dir the per-frame scores are kept in a -Scores-<key>.json sidecar, so
+    runs that only change the threshold or min-scene-len do not decode the video again.
+    chunks > 1 splits the decoding of the video across that many worker processes. With
+    --frame-skip the cuts are refined to the exact frame afterwards. engine="numpy" scores
+    the frames with compute_frame_scores_numpy instead and does not need scenedetect, and
+    engine="keyframes" decodes most of the video only at its keyframes (compute_frame_scores_coarse).
+
+    clip_source picks the detector whose scenes are returned ("content", "threshold" or
+    "adaptive"; by default the first detect-* command in user_commands). Any detector other
+    than a lone detect-content needs engine="numpy", which then runs every detector in
+    user_commands on one decode with detect_scenes_multi.
+    """
+    return detect_scenes_all(video_file, user_commands, score_cache_dir, chunks, engine, clip_source)[0]
+
+def detect_scenes_all(video_file, user_commands, score_cache_dir=None, chunks=1, engine="api", clip_source=None):
+    """detect_scenes_api, also returning the scenes of the other detectors: (clips, {detector: clips}).
+
+    The second value is empty unless several detect-* commands are given (engine="numpy").
+    """
+    settings = parse_user_commands(user_commands)
+    detectors = settings.get("detectors") or ["content"]
+    clip_source = clip_source or detectors[0]
+    if clip_source not in detectors:
+        detectors = detectors + [clip_source]
+    if set(detectors) != {"content"}:
+        if engine != "numpy":
+            raise ValueError("detect-threshold, detect-adaptive and --clip_source other than content need --engine numpy (or --engine cli).")
+        results = detect_scenes_multi(video_file, user_commands, score_cache_dir, detectors)
+        clips = results.pop(clip_source)
+        return clips, results
+
+    score_data = load_frame_scores(video_file, settings, score_cache_dir, chunks, engine)
+    clips = scenes_for_detector("content", score_data, settings)
+    if engine == "keyframes":
+        # The candidate regions are scored at full frame rate, so the cuts are already exact
+        return clips, {}
+    return refine_cuts(video_file, clips, settings, engine), {}
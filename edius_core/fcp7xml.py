@@ -0,0 +1,448 @@
+"""The FCP7 XML (xmeml version 5) that EDIUS imports, built as an ElementTree or streamed to a file."""
+import io
+import os
+import xml.etree.ElementTree as ET
+from itertools import chain
+
+from .clips import combine_scene_data, load_scene_data
+
+# How the scenes of the detectors other than the clip source ("detector_clips") are put in the sequence:
+# "tracks" gives each detector its own video track above V1, "markers" a sequence marker at each of its cuts
+DETECTOR_LAYOUTS = ("tracks", "markers")
+
+def convert_jsons_to_xml(json_file_paths, xml_file_path, name=None, detector_layout="tracks"):
+    """Write one XML sequence with the scenes of several -Scenes JSON files placed back-to-back."""
+    name = name or os.path.splitext(os.path.basename(xml_file_path))[0]
+    data = combine_scene_data([load_scene_data(path) for path in json_file_paths], name)
+    with open(xml_file_path, 'w', encoding='utf-8') as f:
+        write_xml_structure(data, f, detector_layout)
+    print("Conversion completed successfully!")
+    return xml_file_path
+
+def convert_clips_to_xml(video_info, clips, xml_file_path, detector_clips=None, detector_layout="tracks"):
+    """Write the XML straight from extract_video_info's metadata and the clips, without a JSON file in between."""
+    data = dict(video_info)
+    data["clips"] = clips
+    if detector_clips:
+        data["detector_clips"] = detector_clips
+    with open(xml_file_path, 'w', encoding='utf-8') as f:
+        write_xml_structure(data, f, detector_layout)
+    print("Conversion completed successfully!")
+
+def convert_json_to_xml(json_file_path, xml_file_path, detector_layout="tracks"):
+    data = load_scene_data(json_file_path)
+    with open(xml_file_path, 'w', encoding='utf-8') as f:
+        write_xml_structure(data, f, detector_layout)
+    print("Conversion completed successfully!")
+
+def _escape_xml(text):
+    # Same escaping as minidom uses for both text and attribute values
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+def _write_element(out, element, indent):
+    """Write an element and its children laid out exactly like minidom's toprettyxml(indent="  ")."""
+    out.write(f"{indent}<{element.tag}")
+    for name, value in element.attrib.items():
+        out.write(f' {name}="{_escape_xml(value)}"')
+    if len(element):
+        out.write(">\n")
+        for child in element:
+            _write_element(out, child, indent + "  ")
+        out.write(f"{indent}</{element.tag}>\n")
+    elif element.text:
+        out.write(f">{_escape_xml(element.text)}</{element.tag}>\n")
+    else:
+        out.write("/>\n")
+
+def _render_element(element, indent):
+    out = io.StringIO()
+    _write_element(out, element, indent)
+    return out.getvalue()
+
+def _write_track(out, items, indent):
+    # items are the track's children, already rendered at indent + "  ". An empty track is written as <track/>, like minidom does
+    opened = False
+    for item in items:
+        if not opened:
+            out.write(f"{indent}<track>\n")
+            opened = True
+        out.write(item)
+    out.write(f"{indent}</track>\n" if opened else f"{indent}<track/>\n")
+
+def _channel_count(file_data):
+    # Videos without an audio stream have no audio clips
+    return file_data["media"]["audio"]["channelcount"] if "audio" in file_data["media"] else 0
+
+def sequence_sources(data):
+    """Return the (file_data, clips, timeline offset) of every source of a sequence, and the sequence duration.
+
+    Single-video data is a sequence with one source at offset 0. Multi-source data lists the
+    videos in "sources", which are placed back-to-back, each taking its full duration.
+    """
+    sources = []
+    offset = 0
+    rate = None
+    for source in data.get("sources", [data]):
+        file_data = source["video"]["file"]
+        source_rate = file_data["media"]["video"]["timecode"]["rate"]
+        if rate is None:
+            rate = source_rate
+        elif (source_rate.get("timebase"), source_rate.get("ntsc")) != (rate.get("timebase"), rate.get("ntsc")):
+            raise ValueError(f"'{file_data['name']}' has a different frame rate from '{sources[0][0]['name']}'; a sequence needs one frame rate.")
+        sources.append((file_data, source["clips"], offset))
+        offset += file_data["media"]["video"]["duration"]
+    if not sources:
+        raise ValueError("The sequence has no sources.")
+    return sources, offset
+
+def sequence_detectors(data):
+    """The detectors whose scenes the data carries in "detector_clips" besides its clips, in order of appearance."""
+    return list(dict.fromkeys(detector for source in data.get("sources", [data]) for detector in source.get("detector_clips", {})))
+
+def _detector_sources(data, detector):
+    # sequence_sources' (file_data, clips, offset) with one detector's clips; sources without them have none
+    sources, _ = sequence_sources(data)
+    return [(file_data, source.get("detector_clips", {}).get(detector, []), offset)
+            for (file_data, _, offset), source in zip(sources, data.get("sources", [data]))]
+
+def _iter_detector_cuts(data, detector):
+    # Timeline frames of a detector's cuts: every clip start except the first clip of a source
+    for file_data, clips, offset in _detector_sources(data, detector):
+        for i, clip in enumerate(clips):
+            if i:
+                yield offset + clip["start"]
+
+def _iter_sequence_clips(sources, channel=None):
+    # (clip number, clip, file_data, offset) for the clips of all sources, numbered across the
+    # sequence; with a channel, only clips of sources that have that audio channel
+    number = 0
+    for file_data, clips, offset in sources:
+        skip = channel is not None and _channel_count(file_data) < channel
+        for clip in clips:
+            number += 1
+            if not skip:
+                yield number, clip, file_data, offset
+
+class FileRegistry:
+    """The <file> ids of a sequence. The first clipitem of a source gets its full <file>
+    element and every later clipitem only references it by id, so each file is written once."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def add_file(self, parent, file_data, rate_data):
+        file_id = self.ids.get(file_data["pathurl"])
+        if file_id:
+            ET.SubElement(parent, "file", id=file_id)
+        else:
+            file_id = self.ids[file_data["pathurl"]] = f"file-{len(self.ids) + 1}"
+            add_file_element(parent, file_data, rate_data, file_id)
+
+    def render_file(self, file_data, rate_data, indent):
+        """The <file> element of a clipitem as text: in full the first time, a reference after that."""
+        file_id = self.ids.get(file_data["pathurl"])
+        if file_id:
+            return f'{indent}<file id="{_escape_xml(file_id)}"/>\n'
+        parent = ET.Element("clipitem")
+        self.add_file(parent, file_data, rate_data)
+        return _render_element(parent[0], indent)
+
+class ClipitemTemplates:
+    """Clipitems of the streamed XML, rendered once per track and source and then stamped out per clip.
+
+    A clipitem differs between the clips of a track only in its clip number (id and links), its
+    frames and whether it carries the full <file> element. The rest, including the channel count
+    + 1 <link> blocks, is rendered to text once with add_clipitem, so each clip costs one
+    str.format_map instead of building and writing a few hundred elements.
+    """
+
+    def __init__(self, registry, rate_data, indent):
+        self.registry = registry
+        self.rate_data = rate_data
+        self.indent = indent
+        self.templates = {}
+
+    def render(self, clip_id_format, media_type, number, clip, file_data, offset, detector=None):
+        key = (clip_id_format, detector, file_data["pathurl"])
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = self._build(clip_id_format, media_type, file_data, detector)
+        return template.format_map({
+            "index": number, "duration": clip["end"] - clip["start"], "in": clip["start"], "out": clip["end"],
+            "start": offset + clip["start"], "end": offset + clip["end"],
+            "file": self.registry.render_file(file_data, self.rate_data, self.indent + "  "),
+        })
+
+    def _build(self, clip_id_format, media_type, file_data, detector):
+        # Build one clipitem with markers in place of the per-clip values, then turn the markers into format fields
+        parent = ET.Element("track")
+        add_clipitem(parent, {"start": 0, "end": 0}, media_type, clip_id_format.format("\0index\0"), FileRegistry(), file_data, self.rate_data, _channel_count(file_data),
+                     detector=detector)
+        clip_item = parent[0]
+        for field in ("duration", "in", "out", "start", "end"):
+            clip_item.find(field).text = f"\0{field}\0"
+        file_element = clip_item.find("file")
+        clip_item.insert(list(clip_item).index(file_element), ET.Element("\0file\0"))
+        clip_item.remove(file_element)
+
+        template = _render_element(clip_item, self.indent).replace("{", "{{").replace("}", "}}")
+        template = template.replace(f"{self.indent}  <\0file\0/>\n", "{file}")
+        for field in ("index", "duration", "in", "out", "start", "end"):
+            template = template.replace(f"\0{field}\0", f"{{{field}}}")
+        return template
+
+def _iter_clipitems(clips, media_type, clip_id_format, start_id, templates, detector=None):
+    # Renders one clipitem at a time so only a single clip is in memory
+    for i, clip, file_data, offset in clips:
+        yield templates.render(clip_id_format, media_type, start_id + i - 1, clip, file_data, offset, detector)
+
+def write_xml_structure(data, out, detector_layout="tracks"):
+    """Stream the XML for the JSON data to a text file, producing the same output as create_xml_structure."""
+    if detector_layout not in DETECTOR_LAYOUTS:
+        raise ValueError(f"Unknown detector layout '{detector_layout}', choose from {', '.join(DETECTOR_LAYOUTS)}.")
+    sources, duration = sequence_sources(data)
+    detectors = sequence_detectors(data)
+    rate_data = sources[0][0]["media"]["video"]["timecode"]["rate"]
+    channel_count = max(_channel_count(file_data) for file_data, _, _ in sources)
+    templates = ClipitemTemplates(FileRegistry(), rate_data, "          ")
+
+    out.write('<?xml version="1.0" ?>\n<!DOCTYPE xmeml>\n<xmeml version="5">\n  <sequence id="sequence-1">\n')
+    header = ET.Element("sequence")
+    add_sequence_header(header, data)
+    for element in header:
+        _write_element(out, element, "    ")
+
+    out.write("    <media>\n      <video>\n")
+    clip_count = 0
+    def count_clips(clips):
+        nonlocal clip_count
+        for clip in clips:
+            clip_count = clip[0]
+            yield clip
+    _write_track(out, _iter_clipitems(count_clips(_iter_sequence_clips(sources)), "video", "Clip {}", 1, templates), "        ")
+    if detector_layout == "tracks":
+        for track_index, detector in enumerate(detectors, start=2):
+            clipitems = _iter_clipitems(_iter_sequence_clips(_detector_sources(data, detector)), "video", f"ClipV{track_index} {{}}", 1, templates, detector)
+            _write_track(out, chain(clipitems, ["          <enabled>FALSE</enabled>\n          <locked>FALSE</locked>\n"]), "        ")
+    out.write("      </video>\n")
+
+    # Audio elements and tracks
+    if channel_count < 1:
+        out.write("      <audio/>\n")
+    else:
+        out.write("      <audio>\n")
+        audio_clip_id = 1
+        for channel in range(1, channel_count + 1):
+            track_settings = (f"          <enabled>TRUE</enabled>\n          <locked>FALSE</locked>\n"
+                              f"          <outputchannelindex>{channel}</outputchannelindex>\n")
+            clipitems = _iter_clipitems(_iter_sequence_clips(sources, channel), "audio", f"ClipA{channel} {{}}", audio_clip_id, templates)
+            _write_track(out, chain(clipitems, [track_settings]), "        ")
+            audio_clip_id += clip_count
+        out.write("      </audio>\n")
+    out.write("    </media>\n")
+    if detector_layout == "markers":
+        for detector in detectors:
+            for frame in _iter_detector_cuts(data, detector):
+                marker = ET.Element("sequence")
+                add_marker(marker, detector, frame)
+                _write_element(out, marker[0], "    ")
+    out.write("  </sequence>\n</xmeml>")
+
+def create_xml_structure(data, detector_layout="tracks"):
+    """Build the XML for the JSON data as an ElementTree.
+
+    The clips go on video track 1, linked to one audio track per channel. The scenes of any
+    other detectors in "detector_clips" are added as detector_layout says (see DETECTOR_LAYOUTS):
+    as unlinked, switched-off video tracks 2, 3... or as sequence markers at their cuts.
+    """
+    if detector_layout not in DETECTOR_LAYOUTS:
+        raise ValueError(f"Unknown detector layout '{detector_layout}', choose from {', '.join(DETECTOR_LAYOUTS)}.")
+    sources, duration = sequence_sources(data)
+    detectors = sequence_detectors(data)
+    rate_data = sources[0][0]["media"]["video"]["timecode"]["rate"]
+    registry = FileRegistry()
+
+    # Root element
+    root = ET.Element("xmeml", version="5")
+    
+    # Sequence element
+    sequence = ET.SubElement(root, "sequence", id="sequence-1")
+    add_sequence_header(sequence, data)
+
+    # Media element
+    media = ET.SubElement(sequence, "media")
+    
+    # Video element under media
+    video = ET.SubElement(media, "video")
+
+    # Track element under video
+    video_track = ET.SubElement(video, "track")
+    clip_count = 0
+    for i, clip, file_data, offset in _iter_sequence_clips(sources):
+        clip_id = f"Clip {i}"
+        add_clipitem(video_track, clip, "video", clip_id, registry, file_data, rate_data, _channel_count(file_data), offset)
+        clip_count = i
+
+    # The other detectors' scenes on video tracks of their own
+    if detector_layout == "tracks":
+        for track_index, detector in enumerate(detectors, start=2):
+            track = ET.SubElement(video, "track")
+            for i, clip, file_data, offset in _iter_sequence_clips(_detector_sources(data, detector)):
+                add_clipitem(track, clip, "video", f"ClipV{track_index} {i}", registry, file_data, rate_data, 0, offset, detector)
+            ET.SubElement(track, "enabled").text = "FALSE"
+            ET.SubElement(track, "locked").text = "FALSE"
+
+    # Audio elements and tracks
+    audio_clip_id = 1
+    audio = ET.SubElement(media, "audio")
+    channel_count = max(_channel_count(file_data) for file_data, _, _ in sources)
+    for channel in range(1, channel_count + 1):
+        add_audio_track(audio, _iter_sequence_clips(sources, channel), audio_clip_id, channel, registry, rate_data)
+        audio_clip_id += clip_count
+
+    # Or as markers at their cuts
+    if detector_layout == "markers":
+        for detector in detectors:
+            for frame in _iter_detector_cuts(data, detector):
+                add_marker(sequence, detector, frame)
+
+    return root
+
+def add_sequence_header(sequence, data):
+    sources, duration = sequence_sources(data)
+    video_data = sources[0][0]["media"]["video"]
+
+    # Sequence name from JSON
+    ET.SubElement(sequence, "name").text = data["sequence"]["name"]
+    
+    # Duration of all sources together
+    ET.SubElement(sequence, "duration").text = str(duration)
+    
+    # Add rate element
+    add_rate(sequence, video_data["timecode"]["rate"])
+
+    # Timecode element
+    timecode = ET.SubElement(sequence, "timecode")
+    add_rate(timecode, video_data["timecode"]["rate"])
+    
+    # Default timecode settings
+    ET.SubElement(timecode, "string").text = "00:00:00:00"
+    ET.SubElement(timecode, "frame").text = "0"
+    ET.SubElement(timecode, "source").text = "source"
+    ET.SubElement(timecode, "displayformat").text = video_data["timecode"]["displayformat"]
+
+    # Default sequence in and out points
+    ET.SubElement(sequence, "in").text = "-1"
+    ET.SubElement(sequence, "out").text = "-1"
+
+def add_rate(parent, rate_data):
+    # Adding rate element with its sub-elements from JSON
+    rate = ET.SubElement(parent, "rate")
+    ET.SubElement(rate, "ntsc").text = rate_data.get("ntsc", "FALSE")
+    ET.SubElement(rate, "timebase").text = str(rate_data.get("timebase", 30))
+
+def add_clipitem(parent, clip, media_type, clip_id, registry, file_data, rate_data, channel_count, offset=0, detector=None):
+    # Adding clipitem element with various properties from JSON; offset is where the clip's source starts on the timeline.
+    # A clip on a detector's own track is named after the detector and not linked to the audio.
+    clip_item = ET.SubElement(parent, "clipitem", id=clip_id)
+    ET.SubElement(clip_item, "name").text = f"{file_data['name']} ({detector})" if detector else file_data["name"]
+    ET.SubElement(clip_item, "enabled").text = "TRUE"
+    ET.SubElement(clip_item, "duration").text = str(clip["end"] - clip["start"])
+    add_rate(clip_item, rate_data)
+    ET.SubElement(clip_item, "in").text = str(clip["start"])
+    ET.SubElement(clip_item, "out").text = str(clip["end"])
+    ET.SubElement(clip_item, "start").text = str(offset + clip["start"])
+    ET.SubElement(clip_item, "end").text = str(offset + clip["end"])
+    ET.SubElement(clip_item, "anamorphic").text = "FALSE"
+    ET.SubElement(clip_item, "pixelaspectratio").text = "Square"
+    ET.SubElement(clip_item, "alphatype").text = "none"
+
+    # The full file element for the first clipitem of the file, a reference to it for the others
+    registry.add_file(clip_item, file_data, rate_data)
+
+    # Adding sourcetrack element with mediatype from JSON or defaults
+    sourcetrack = ET.SubElement(clip_item, "sourcetrack")
+    ET.SubElement(sourcetrack, "mediatype").text = media_type
+    if media_type == "audio":
+        track_index = 1 if clip_id.startswith("ClipA1") else 2
+        ET.SubElement(sourcetrack, "trackindex").text = str(track_index)
+
+    # Adding link elements for clipitem
+    if not detector:
+        add_link_elements(clip_item, clip_id, media_type, channel_count)
+
+def add_marker(parent, detector, frame):
+    # A sequence marker at a cut found by one detector, named after it
+    marker = ET.SubElement(parent, "marker")
+    ET.SubElement(marker, "name").text = detector
+    ET.SubElement(marker, "comment").text = f"Cut found by detect-{detector}"
+    ET.SubElement(marker, "in").text = str(frame)
+    ET.SubElement(marker, "out").text = "-1"
+
+def add_file_element(parent, file_data, rate_data, file_id="file-1"):
+    # Adding file element with properties from JSON
+    file_element = ET.SubElement(parent, "file", id=file_id)
+    ET.SubElement(file_element, "name").text = file_data["name"]
+    ET.SubElement(file_element, "pathurl").text = file_data["pathurl"]
+    add_rate(file_element, rate_data)
+    ET.SubElement(file_element, "duration").text = str(file_data["media"]["video"]["duration"])
+
+    # Adding timecode element with properties from JSON
+    file_timecode = ET.SubElement(file_element, "timecode")
+    add_rate(file_timecode, rate_data)
+    ET.SubElement(file_timecode, "string").text = file_data["media"]["video"]["timecode"]["first_timecode"]
+    ET.SubElement(file_timecode, "frame").text = "0"
+    ET.SubElement(file_timecode, "source").text = "source"
+    ET.SubElement(file_timecode, "displayformat").text = file_data["media"]["video"]["timecode"]["displayformat"]
+
+    # Adding media element with video and audio properties from JSON
+    file_media = ET.SubElement(file_element, "media")
+    video = ET.SubElement(file_media, "video")
+    add_video_format(video, file_data["media"]["video"]["samplecharacteristics"], rate_data)
+    if "audio" in file_data["media"]:
+        audio = ET.SubElement(file_media, "audio")
+        add_audio_format(audio, file_data["media"]["audio"]["samplecharacteristics"], file_data["media"]["audio"]["channelcount"])
+
+def add_video_format(video, samplecharacteristics, rate_data):
+    # Adding video format and sample characteristics from JSON
+    sample_characteristics = ET.SubElement(video, "samplecharacteristics")
+    add_rate(sample_characteristics, rate_data)
+    ET.SubElement(sample_characteristics, "width").text = str(samplecharacteristics["width"])
+    ET.SubElement(sample_characteristics, "height").text = str(samplecharacteristics["height"])
+    ET.SubElement(sample_characteristics, "anamorphic").text = samplecharacteristics["anamorphic"]
+    ET.SubElement(sample_characteristics, "pixelaspectratio").text = samplecharacteristics["pixelaspectratio"]
+
+def add_audio_format(audio, samplecharacteristics, channel_count):
+    # Adding audio format and sample characteristics from JSON
+    sample_characteristics = ET.SubElement(audio, "samplecharacteristics")
+    ET.SubElement(sample_characteristics, "depth").text = str(samplecharacteristics["depth"])
+    ET.SubElement(sample_characteristics, "samplerate").text = str(samplecharacteristics["samplerate"])
+    ET.SubElement(audio, "channelcount").text = str(channel_count)
+
+def add_audio_track(parent, clips, start_id, track_index, registry, rate_data):
+    # Adding audio track with clipitems from JSON; clips are _iter_sequence_clips' (number, clip, file_data, offset)
+    audio_track = ET.SubElement(parent, "track")
+    for i, clip, file_data, offset in clips:
+        clip_id = f"ClipA{track_index} {start_id + i - 1}"
+        add_clipitem(audio_track, clip, "audio", clip_id, registry, file_data, rate_data, _channel_count(file_data), offset)
+    ET.SubElement(audio_track, "enabled").text = "TRUE"
+    ET.SubElement(audio_track, "locked").text = "FALSE"
+    ET.SubElement(audio_track, "outputchannelindex").text = str(track_index)
+
+def add_link_elements(clip_item, clip_id, media_type, channel_count):
+    # Adding link elements to clipitem to ensure proper video and audio synchronization
+    clip_index = clip_id.split()[-1]
+    video_link = (f"Clip {clip_index}", "video", 1, clip_index)
+    audio_links = [(f"ClipA{channel} {clip_index}", "audio", channel, clip_index) for channel in range(1, channel_count + 1)]
+
+    # Ensure the first link is always video, followed by audio channels
+    links = [video_link] + audio_links
+
+    for linkclipref, linkmediatype, trackindex, clipindex in links:
+        link = ET.SubElement(clip_item, "link")
+        ET.SubElement(link, "linkclipref").text = linkclipref
+        ET.SubElement(link, "mediatype").text = linkmediatype
+        ET.SubElement(link, "trackindex").text = str(trackindex)
+        ET.SubElement(link, "clipindex").text = clipindex
+        if linkmediatype == "audio":
+            ET.SubElement(link, "groupindex").text = "1"
@@ -0,0 +1,152 @@
+"""One ffmpeg decode shared by several detectors: raw frames go into a shared-memory ring that detector processes read in place."""
+import multiprocessing
+import subprocess
+from multiprocessing import shared_memory
+
+from .detection import NUMPY_BATCH_PIXELS, ContentScorer, _import_numpy, _numpy_decode_command, _read_frames
+
+# Number of frame batches in the ring. ffmpeg can decode this many batches ahead of the slowest detector.
+RING_SLOTS = 4
+
+class IntensityScorer:
+    """ThresholdDetector's frame metric for batches of RGB frames: the mean value of all pixels and channels."""
+    def __init__(self, np):
+        self.np = np
+
+    def __call__(self, frames):
+        np = self.np
+        sums = frames.reshape(len(frames), -1).sum(axis=1, dtype=np.uint64)
+        return (sums / float(frames[0].size)).tolist()
+
+def _make_scorer(np, metric, settings):
+    if metric == "intensity":
+        return IntensityScorer(np)
+    return ContentScorer(np, bool(settings.get("luma_only")))
+
+def _ring_worker(memory_name, shape, counts, free, filled, metric, settings, connection):
+    # Score every batch that the parent puts in the ring, then send back all scores at once.
+    # A count of 0 in the next slot marks the end of the video.
+    memory = None
+    try:
+        np = _import_numpy()
+        memory = shared_memory.SharedMemory(name=memory_name)
+        ring = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+        scorer = _make_scorer(np, metric, settings)
+        step = int(settings.get("frame_skip", 0)) + 1
+        scores = []
+        slot = 0
+        while True:
+            filled.acquire()
+            count = counts[slot]
+            if count <= 0:
+                break
+            batch = [None] * count
+            batch[::step] = scorer(ring[slot, :count:step])
+            scores.extend(batch)
+            free.release()
+            slot = (slot + 1) % shape[0]
+        # The view must be gone before the shared memory can be closed
+        del ring
+        connection.send((count == 0, scores if count == 0 else "Decoding was stopped."))
+    except Exception as e:
+        connection.send((False, f"{metric} detector failed: {e}"))
+    finally:
+        if memory is not None:
+            memory.close()
+        connection.close()
+
+def _acquire(semaphore, process, receiver):
+    # Wait for a worker without hanging forever when it has died, passing on its error if it sent one
+    while not semaphore.acquire(timeout=1.0):
+        if not process.is_alive():
+            message = receiver.recv()[1] if receiver.poll() else "A detector process stopped unexpectedly."
+            raise RuntimeError(message)
+
+def compute_frame_metrics_ring(video_file, settings, metrics, batch_pixels=NUMPY_BATCH_PIXELS, slots=RING_SLOTS):
+    """Decode a video once and compute several per-frame metrics ("content", "intensity") on it in parallel.
+
+    ffmpeg's raw RGB output is read straight into a ring of frame batches in shared memory,
+    so the frames are neither copied nor pickled again. One worker process per metric reads
+    each batch in place and frees the slot, and a slot is reused once every worker is done
+    with it. Returns {metric: score data}, each like compute_frame_scores_numpy's.
+    """
+    np = _import_numpy()
+    command, fps, width, height, start_frame = _numpy_decode_command(video_file, settings)
+    step = int(settings.get("frame_skip", 0)) + 1
+    batch_frames = max(1, batch_pixels // (width * height)) * step
+    shape = (slots, batch_frames, height, width, 3)
+
+    context = multiprocessing.get_context()
+    memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    counts = context.Array("i", slots, lock=False)
+    workers = []
+    process = None
+    # The next slot to fill; the workers are waiting for it
+    slot = 0
+    decoded = False
+    ring = None
+    try:
+        ring = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+        for metric in metrics:
+            receiver, sender = context.Pipe(duplex=False)
+            free, filled = context.Semaphore(slots), context.Semaphore(0)
+            worker = context.Process(target=_ring_worker, args=(memory.name, shape, counts, free, filled, metric, settings, sender), daemon=True)
+            worker.start()
+            sender.close()
+            workers.append((metric, worker, free, filled, receiver))
+
+        print(f"Detecting scenes with NumPy ({', '.join(metrics)}, one decode): {video_file}")
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        total = 0
+        finished = False
+        while True:
+            for metric, worker, free, filled, receiver in workers:
+                _acquire(free, worker, receiver)
+            count = 0 if finished else _read_frames(process.stdout, ring[slot])
+            counts[slot] = count
+            for metric, worker, free, filled, receiver in workers:
+                filled.release()
+            slot = (slot + 1) % slots
+            total += count
+            if not count:
+                break
+            finished = count < batch_frames
+        decoded = True
+
+        results = {}
+        for metric, worker, free, filled, receiver in workers:
+            try:
+                ok, scores = receiver.recv()
+            except EOFError:
+                ok, scores = False, f"{metric} detector stopped unexpectedly."
+            if not ok:
+                raise RuntimeError(scores)
+            results[metric] = {"fps": fps, "start_frame": start_frame, "end_frame": start_frame + len(scores), "scores": scores}
+    finally:
+        error = ""
+        if process is not None:
+            if not decoded:
+                process.kill()
+            process.stdout.close()
+            error = process.stderr.read().decode(errors="replace").strip()
+            process.stderr.close()
+            process.wait()
+        if not decoded:
+            # Workers waiting for the next batch are told to stop instead
+            counts[slot] = -1
+        for metric, worker, free, filled, receiver in workers:
+            if not decoded:
+                filled.release()
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+            receiver.close()
+        # The view must be gone before the shared memory can be closed
+        ring = None
+        memory.close()
+        memory.unlink()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on '{video_file}': {error}")
+    if not total:
+        raise RuntimeError(f"No frames could be decoded from '{video_file}'.")
+    return results
@@ -0,0 +1,144 @@
+"""Scene images: the first and last frame of every scene grabbed in one sequential ffmpeg pass, and contact sheets."""
+import os
+import shutil
+import subprocess
+import tempfile
+
+from .clips import load_scene_data
+from .probe import find_tool
+
+# Contact sheets are pages of this many columns and rows of first-frame thumbnails
+SHEET_COLUMNS = 5
+
+SHEET_ROWS = 6
+
+SHEET_THUMB_WIDTH = 320
+
+def scene_image_frames(clips):
+    """Return the frame to grab for every image, as {frame number: [(scene number, image number), ...]}.
+
+    Image 01 of a scene is its first frame and image 02 its last one, like scenedetect's
+    save-images --num-images 2. A one-frame scene uses the same frame for both.
+    """
+    frames = {}
+    for scene, clip in enumerate(clips, start=1):
+        for image, frame in enumerate((clip["start"], max(clip["start"], clip["end"] - 1)), start=1):
+            frames.setdefault(frame, []).append((scene, image))
+    return frames
+
+def scene_image_name(base_name, scene, image, extension="jpg"):
+    # Same names as scenedetect's save-images: $VIDEO_NAME-Scene-$SCENE_NUMBER-$IMAGE_NUMBER
+    return f"{base_name}-Scene-{scene:03d}-{image:02d}.{extension}"
+
+def _select_expression(frame_numbers):
+    # 1 on the sorted frame numbers, 0 elsewhere. Runs of consecutive frames (the last frame of a
+    # scene and the first of the next) become one between(), and the runs are halved with nested
+    # if(lt(n, ...)). ffmpeg evaluates the expression recursively for every decoded frame, so it
+    # must nest only log2(runs) deep: a flat sum of thousands of eq() overflows a 1 MB thread
+    # stack (the Windows default) and costs one term per scene per frame.
+    runs = []
+    for frame in frame_numbers:
+        if runs and frame == runs[-1][1] + 1:
+            runs[-1][1] = frame
+        else:
+            runs.append([frame, frame])
+
+    def build(low, high):
+        if high - low == 1:
+            first, last = runs[low]
+            return f"eq(n,{first})" if first == last else f"between(n,{first},{last})"
+        middle = (low + high) // 2
+        return f"if(lt(n,{runs[middle][0]}),{build(low, middle)},{build(middle, high)})"
+    return build(0, len(runs))
+
+def _select_filter(frame_numbers, width):
+    # select keeps only the wanted frames of the one decode; scaling after it only touches those
+    graph = f"select='{_select_expression(frame_numbers)}'"
+    if width:
+        graph += f",scale={int(width)}:-2"
+    return graph
+
+def _run_ffmpeg(command, started=None):
+    # started receives the process, so a GUI can kill it to cancel
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if started:
+        started(process)
+    _, error = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {error.decode(errors='replace').strip() or process.returncode}")
+
+def save_scene_images(video_file, clips, output_dir, base_name=None, width=None, contact_sheet=False, started=None):
+    """Write the first and last frame of every clip as JPEG images in output_dir. Returns the image paths.
+
+    All frames come from one sequential decode of the video. ffmpeg's select filter keeps only
+    the wanted frame numbers, so there is no seek per scene, which is what makes scenedetect's
+    save-images slow on long files on network storage. The frame list goes to ffmpeg in a
+    filter script, so thousands of scenes do not hit the command line length limit. width
+    scales the images (the height follows the aspect ratio). With contact_sheet, pages of
+    first-frame thumbnails are also written as <name>-Sheet-NN.jpg.
+    """
+    base_name = base_name or os.path.splitext(os.path.basename(video_file))[0]
+    clips = list(clips)
+    frames = scene_image_frames(clips)
+    frame_numbers = sorted(frames)
+    if not frame_numbers:
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    # ffmpeg numbers its output images in frame order; they are renamed once all are written
+    work_dir = tempfile.mkdtemp(prefix=f".{base_name}-images-", dir=output_dir)
+    try:
+        script_file = os.path.join(work_dir, "select.txt")
+        with open(script_file, 'w') as file:
+            file.write(_select_filter(frame_numbers, width))
+        command = [find_tool("ffmpeg") or "ffmpeg", "-v", "error", "-nostdin", "-y", "-i", video_file, "-map", "0:v:0",
+                   "-filter_script:v", script_file, "-vsync", "0", "-q:v", "2", "-f", "image2", "-start_number", "0",
+                   os.path.join(work_dir, "%08d.jpg")]
+        print(f"Saving {len(frames)} scene frame(s) in one pass: {video_file}")
+        _run_ffmpeg(command, started)
+
+        image_files = []
+        for index, frame in enumerate(frame_numbers):
+            grabbed = os.path.join(work_dir, f"{index:08d}.jpg")
+            if not os.path.exists(grabbed):
+                raise RuntimeError(f"Frame {frame} of '{video_file}' could not be read; the video has fewer frames than the scene list.")
+            names = frames[frame]
+            for scene, image in names[1:]:
+                image_files.append(os.path.join(output_dir, scene_image_name(base_name, scene, image)))
+                shutil.copyfile(grabbed, image_files[-1])
+            scene, image = names[0]
+            image_files.append(os.path.join(output_dir, scene_image_name(base_name, scene, image)))
+            os.replace(grabbed, image_files[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if contact_sheet:
+        first_images = [os.path.join(output_dir, scene_image_name(base_name, scene, 1)) for scene in range(1, len(clips) + 1)]
+        write_contact_sheet(first_images, os.path.join(output_dir, f"{base_name}-Sheet-%02d.jpg"), started)
+    return sorted(image_files)
+
+def write_contact_sheet(image_files, sheet_pattern, started=None, columns=SHEET_COLUMNS, rows=SHEET_ROWS, thumb_width=SHEET_THUMB_WIDTH):
+    """Tile images into pages of columns x rows thumbnails with ffmpeg's tile filter. sheet_pattern numbers the pages (%02d).
+
+    The small images already on disk are read back, not the video, so this costs little.
+    """
+    list_file = os.path.splitext(sheet_pattern.replace("%02d", "list"))[0] + ".txt"
+    with open(list_file, 'w', encoding='utf-8') as file:
+        for image_file in image_files:
+            escaped = os.path.abspath(image_file).replace("\\", "/").replace("'", "'\\''")
+            file.write(f"file '{escaped}'\n")
+    command = [find_tool("ffmpeg") or "ffmpeg", "-v", "error", "-nostdin", "-y", "-f", "concat", "-safe", "0", "-i", list_file,
+               "-vf", f"scale={thumb_width}:-2,tile={columns}x{rows}:margin=4:padding=4", "-vsync", "0", "-q:v", "3",
+               "-f", "image2", "-start_number", "1", sheet_pattern]
+    try:
+        _run_ffmpeg(command, started)
+    finally:
+        os.remove(list_file)
+
+def save_scene_images_from_json(json_file, output_dir=None, width=None, contact_sheet=False, started=None):
+    """save_scene_images for the video and clips of a -Scenes JSON file, writing next to it by default."""
+    data = load_scene_data(json_file)
+    file_data = data["video"]["file"]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(json_file))
+    base_name = os.path.splitext(file_data["name"])[0]
+    return save_scene_images(file_data["pathurl"], data["clips"], output_dir, base_name, width, contact_sheet, started)
@@ -0,0 +1,223 @@
+"""Video metadata: finding ffmpeg/ffprobe, probing a video once (with an sqlite cache) and the JSON video info."""
+import contextlib
+import functools
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+from fractions import Fraction
+
+# ffprobe results are cached in this sqlite file inside the output directory
+PROBE_CACHE_NAME = "ffprobe_cache.sqlite3"
+
+# Everything extract_video_info needs, fetched with a single ffprobe call
+PROBE_ENTRIES = "stream=index,codec_type,width,height,display_aspect_ratio,r_frame_rate,duration,sample_rate,channels,bits_per_raw_sample:format_tags=timecode"
+
+@functools.lru_cache(maxsize=None)
+def find_tool(name):
+    """Resolve an executable on PATH once per process. Returns None when it is missing."""
+    return shutil.which(name)
+
+def check_ffmpeg_ffprobe():
+    """Check if ffmpeg and ffprobe are installed."""
+    return bool(find_tool("ffmpeg") and find_tool("ffprobe"))
+
+def _probe_cache_key(video_file):
+    path = os.path.normcase(os.path.abspath(video_file))
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+def _open_probe_cache(cache_dir):
+    connection = sqlite3.connect(os.path.join(cache_dir, PROBE_CACHE_NAME), timeout=30)
+    connection.execute("CREATE TABLE IF NOT EXISTS probe (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, result TEXT)")
+    return connection
+
+def _read_probe_cache(cache_dir, key):
+    try:
+        connection = _open_probe_cache(cache_dir)
+        try:
+            row = connection.execute("SELECT result FROM probe WHERE path = ? AND size = ? AND mtime_ns = ?", key).fetchone()
+        finally:
+            connection.close()
+        if row:
+            return json.loads(row[0])
+    except sqlite3.Error as e:
+        print(f"Could not read ffprobe cache: {e}")
+    return None
+
+def _write_probe_cache(cache_dir, key, result):
+    try:
+        connection = _open_probe_cache(cache_dir)
+        try:
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO probe VALUES (?, ?, ?, ?)", key + (result,))
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Could not write ffprobe cache: {e}")
+
+def _probe_command(video_file):
+    return [find_tool("ffprobe") or "ffprobe", "-v", "error", "-show_entries", PROBE_ENTRIES, "-of", "json", video_file]
+
+def probe_video(video_file, cache_dir=None):
+    """Run ffprobe once for a video, reusing the cached result in cache_dir while the file is unchanged."""
+    key = _probe_cache_key(video_file)
+    if cache_dir:
+        cached = _read_probe_cache(cache_dir, key)
+        if cached is not None:
+            return cached
+
+    result = subprocess.run(_probe_command(video_file), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on '{video_file}': {result.stderr.strip()}")
+    ffprobe_output = json.loads(result.stdout)
+
+    if cache_dir:
+        _write_probe_cache(cache_dir, key, result.stdout)
+
+    return ffprobe_output
+
+def probe_keyframes(video_file, fps):
+    """Read the packet index of a video's first video stream without decoding it.
+
+    Returns the frame numbers of the keyframes and the frame count. Frame numbers count from
+    the first frame ffmpeg outputs, so they match the decoders' (-vsync 0) frame order.
+    """
+    command = [find_tool("ffprobe") or "ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_file]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on '{video_file}': {result.stderr.strip()}")
+
+    times = []
+    key_times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.strip().partition(",")
+        if not pts_time or pts_time == "N/A":
+            continue
+        times.append(float(pts_time))
+        if "K" in flags:
+            key_times.append(float(pts_time))
+    if not times:
+        return [], 0
+    # Packets are in decode order; the earliest presentation time is frame 0
+    first = min(times)
+    return sorted({round((time - first) * fps) for time in key_times}), len(times)
+
+def extract_video_info(video_file, cache_dir=None):
+    return video_info_from_probe(video_file, probe_video(video_file, cache_dir))
+
+def video_info_from_probe(video_file, ffprobe_output):
+    """Build the JSON video metadata from probe_video's ffprobe output."""
+    video_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "video"), None)
+    audio_stream = next((stream for stream in ffprobe_output["streams"] if stream["codec_type"] == "audio"), None)
+
+    if not video_stream:
+        raise ValueError("Video stream not found in the file.")
+
+    # NTSC rates (23.976, 29.97, 59.94) are the exact x/1001 ones; their timebase is the rounded rate
+    frame_rate = Fraction(video_stream["r_frame_rate"])
+    ntsc = frame_rate.denominator == 1001
+    timebase = round(frame_rate)
+    duration_seconds = float(video_stream["duration"])
+    duration_frames = int(duration_seconds * frame_rate)
+    # Only SD frames are stored anamorphic; HD and larger frames use square pixels whatever their aspect ratio
+    anamorphic = "TRUE" if video_stream.get("display_aspect_ratio", "16:9") != "16:9" and video_stream["width"] <= 768 else "FALSE"
+
+    # Start timecode from the container tags
+    timecode = "00:00:00:00"  # Default value
+    format_timecode = ffprobe_output.get("format", {}).get("tags", {}).get("timecode", "").strip()
+    if format_timecode:
+        timecode = format_timecode
+
+    video_info = {
+        "sequence": {
+            "name": os.path.splitext(os.path.basename(video_file))[0]
+        },
+        "video": {
+            "file": {
+                "name": os.path.basename(video_file),
+                "pathurl": os.path.abspath(video_file).replace("\\", "/"),
+                "media": {
+                    "video": {
+                        "duration": duration_frames,
+                        "timecode": {
+                            "rate": {
+                                "ntsc": "TRUE" if ntsc else "FALSE",
+                                "timebase": timebase
+                            },
+                            "displayformat": "DF" if ntsc and timebase in (30, 60) else "NDF",
+                            "first_timecode": timecode  # Timecode of the first frame
+                        },
+                        "samplecharacteristics": {
+                            "width": video_stream["width"],
+                            "height": video_stream["height"],
+                            "anamorphic": anamorphic, 
+                            "pixelaspectratio": "Square"
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+    if audio_stream:
+        video_info["video"]["file"]["media"]["audio"] = {
+            "samplecharacteristics": {
+                "depth": audio_stream.get("bits_per_raw_sample", 16),
+                "samplerate": audio_stream.get("sample_rate", "N/A")
+            },
+            "channelcount": audio_stream.get("channels", "N/A")
+        }
+
+    return video_info
+
+async def run_tool_async(command, timeout=None, capture=True):
+    """Run a command without blocking the event loop. Returns (returncode, stdout, stderr) as text.
+
+    The command is killed after `timeout` seconds (RuntimeError) or when the task is cancelled.
+    With capture=False its output goes to the console and stdout/stderr are None.
+    """
+    import asyncio
+
+    pipe = asyncio.subprocess.PIPE if capture else None
+    process = await asyncio.create_subprocess_exec(*command, stdout=pipe, stderr=pipe)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RuntimeError(f"{os.path.basename(command[0])} was stopped after {timeout:g} s: {subprocess.list2cmdline(command)}")
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    decode = lambda data: None if data is None else data.decode(errors="replace")
+    return process.returncode, decode(stdout), decode(stderr)
+
+async def check_ffmpeg_ffprobe_async(timeout=None):
+    """Check that ffmpeg and ffprobe are installed and start, running both at the same time."""
+    import asyncio
+
+    if not check_ffmpeg_ffprobe():
+        return False
+    results = await asyncio.gather(*(run_tool_async([find_tool(name), "-version"], timeout) for name in ("ffmpeg", "ffprobe")), return_exceptions=True)
+    return all(not isinstance(result, Exception) and result[0] == 0 for result in results)
+
+async def probe_video_async(video_file, cache_dir=None, timeout=None, semaphore=None):
+    """probe_video for the event loop. The semaphore limits how many ffprobe processes run at once."""
+    key = _probe_cache_key(video_file)
+    if cache_dir:
+        cached = _read_probe_cache(cache_dir, key)
+        if cached is not None:
+            return cached
+
+    async with semaphore or contextlib.nullcontext():
+        returncode, stdout, stderr = await run_tool_async(_probe_command(video_file), timeout)
+    if returncode != 0:
+        raise RuntimeError(f"ffprobe failed on '{video_file}': {stderr.strip()}")
+    ffprobe_output = json.loads(stdout)
+
+    if cache_dir:
+        _write_probe_cache(cache_dir, key, stdout)
+    return ffprobe_output
@@ -0,0 +1,110 @@
+"""Scene export: every clip written to a file of its own by ffmpeg processes running in parallel."""
+import os
+import subprocess
+from fractions import Fraction
+
+from .clips import load_scene_data
+from .probe import find_tool, probe_video
+
+# copy: stream copy, each file starts at the keyframe at or before its scene. encode: frame-accurate re-encode.
+SPLIT_MODES = ("copy", "encode")
+
+# Stream copies mostly wait on the disk, so a few at once keep it busy without thrashing a NAS
+SPLIT_COPY_WORKERS = 4
+
+# Same codec settings as scenedetect's split-video
+ENCODE_ARGS = ["-map", "0:v:0", "-map", "0:a?", "-map", "0:s?", "-c:v", "libx264", "-preset", "veryfast", "-crf", "22", "-c:a", "aac"]
+
+def scene_file_name(base_name, scene, extension):
+    # Same names as scenedetect's split-video: $VIDEO_NAME-Scene-$SCENE_NUMBER
+    return f"{base_name}-Scene-{scene:03d}{extension}"
+
+def split_command(video_file, output_file, start, end, fps, mode="copy", threads=None):
+    """ffmpeg command writing frames start to end (exclusive) of video_file to output_file.
+
+    Seeking is done on the input (-ss before -i), so ffmpeg jumps to the keyframe before start
+    instead of decoding from the beginning. A stream copy cannot begin between keyframes, so it
+    starts at that keyframe. A re-encode decodes from the keyframe but drops the frames before
+    start, so it begins on the exact frame.
+    """
+    command = [find_tool("ffmpeg") or "ffmpeg", "-v", "error", "-nostdin", "-y", "-ss", f"{start / fps:.6f}", "-i", video_file,
+               "-t", f"{(end - start) / fps:.6f}"]
+    if mode == "copy":
+        command += ["-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        command += ENCODE_ARGS + ["-frames:v", str(end - start)]
+        if threads:
+            command += ["-threads", str(threads)]
+    return command + [output_file]
+
+def _run_segment(command, cancel=None):
+    # communicate() keeps reading stderr, so ffmpeg never blocks on a full pipe while Cancel is polled
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    while True:
+        try:
+            _, error = process.communicate(timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel is not None and cancel.is_set():
+                process.kill()
+    return process.returncode, error.decode(errors="replace").strip()
+
+def split_video(video_file, clips, output_dir, mode="copy", workers=None, base_name=None, cache_dir=None, cancel=None):
+    """Write every clip of video_file to <name>-Scene-NNN in output_dir. Returns the file paths in scene order.
+
+    Each clip is one ffmpeg process, and up to `workers` of them run at once. In copy mode the
+    streams are copied without decoding, so the export costs about one read of the video; the
+    files keep the video's container and start at the keyframe at or before their scene (see
+    split_command). In encode mode each file is an H.264/AAC .mp4 cut on the exact frame, and
+    `workers` is the concurrency budget: the CPU cores are shared out between the encodes, so
+    the budget sets how many run at once, not how many cores are used. cancel is a
+    threading.Event that kills the running ffmpeg processes and skips the rest.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode '{mode}', expected one of {', '.join(SPLIT_MODES)}.")
+    video_stream = next((stream for stream in probe_video(video_file, cache_dir)["streams"] if stream["codec_type"] == "video"), None)
+    if not video_stream:
+        raise ValueError("Video stream not found in the file.")
+    fps = float(Fraction(video_stream["r_frame_rate"]))
+
+    base_name = base_name or os.path.splitext(os.path.basename(video_file))[0]
+    extension = os.path.splitext(video_file)[1] if mode == "copy" else ".mp4"
+    clips = list(clips)
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or (SPLIT_COPY_WORKERS if mode == "copy" else cpu_count // 2), len(clips)))
+    threads = max(1, cpu_count // workers) if mode == "encode" else None
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for scene, clip in enumerate(clips, start=1):
+        output_file = os.path.join(output_dir, scene_file_name(base_name, scene, extension))
+        jobs.append((output_file, split_command(video_file, output_file, clip["start"], clip["end"], fps, mode, threads)))
+
+    def run(job):
+        # Threads are enough here: the work is done by the ffmpeg processes
+        output_file, command = job
+        if cancel is not None and cancel.is_set():
+            return output_file, None, "cancelled"
+        return (output_file,) + _run_segment(command, cancel)
+
+    print(f"Splitting {len(jobs)} scene(s) ({mode}, {workers} at a time): {video_file}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, jobs))
+
+    if cancel is not None and cancel.is_set():
+        raise RuntimeError("Splitting was cancelled.")
+    failures = [(output_file, error) for output_file, returncode, error in results if returncode != 0]
+    if failures:
+        output_file, error = failures[0]
+        raise RuntimeError(f"ffmpeg failed on {len(failures)} of {len(jobs)} scene(s), first {os.path.basename(output_file)}: {error}")
+    return [output_file for output_file, _, _ in results]
+
+def split_video_from_json(json_file, output_dir=None, mode="copy", workers=None, cancel=None):
+    """split_video for the video and clips of a -Scenes JSON file, writing next to it by default."""
+    data = load_scene_data(json_file)
+    file_data = data["video"]["file"]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(json_file))
+    base_name = os.path.splitext(file_data["name"])[0]
+    return split_video(file_data["pathurl"], data["clips"], output_dir, mode, workers, base_name, cancel=cancel)
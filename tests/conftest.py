@@ -0,0 +1,14 @@
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="session")
+def cmd_module():
+    # The command line script is not a package module, so it is loaded from its path
+    spec = importlib.util.spec_from_file_location("cmd_scenedetect", os.path.join(ROOT, "CMD_SceneDetect_to_EDIUS_FCP7XML.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,7 @@
+def test_plan_batch_skips_videos_whose_output_names_collide(cmd_module):
+    videos = ["/cards/a/clip.mp4", "/cards/b/clip.mov", "/cards/a/other.mp4"]
+    jobs, results = cmd_module._plan_batch(videos)
+    assert jobs == ["/cards/a/clip.mp4", "/cards/a/other.mp4"]
+    ok, detail = results["/cards/b/clip.mov"]
+    assert not ok
+    assert "'clip' already used by '/cards/a/clip.mp4'" in detail
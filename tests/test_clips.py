@@ -0,0 +1,21 @@
+import pytest
+
+from edius_core.clips import ClipStore
+
+def test_clip_store_round_trip(tmp_path):
+    clips = [{"id": str(i), "start": start, "end": end} for i, (start, end) in enumerate([(0, 120), (120, 121), (121, 2 ** 31 - 1)], start=1)]
+    path = tmp_path / "v-Scenes.clips"
+    ClipStore.from_clips(clips).save(str(path))
+
+    store = ClipStore.load(str(path))
+    assert len(store) == 3
+    assert list(store) == clips
+    assert store[1] == clips[1]
+    assert store[-1] == clips[-1]
+
+def test_clip_store_rejects_a_truncated_file(tmp_path):
+    path = tmp_path / "v-Scenes.clips"
+    ClipStore.from_clips([{"start": 0, "end": 10}, {"start": 10, "end": 20}]).save(str(path))
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(ValueError):
+        ClipStore.load(str(path))
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CMD_SceneDetect_to_EDIUS_FCP7XML.py")
+
+def run_script(*args):
+    return subprocess.run([sys.executable, SCRIPT, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+def test_split_video_rejected_in_watch_mode(tmp_path):
+    # Scene files written next to the watched videos would be queued and split again, forever
+    result = run_script("--watch", str(tmp_path), "--split_video", "copy")
+    assert result.returncode == 2
+    assert "--split_video cannot be combined with --watch" in result.stderr
+    assert not os.path.exists(tmp_path / "scenedetect_jobs.sqlite3")
+
+def test_sample_every_rejected_with_cli_engine(tmp_path):
+    # scenedetect's CSV keeps the cuts on the sampled frames, up to N-1 frames late
+    result = run_script("--video_file", str(tmp_path / "v.mp4"), "--output_dir", str(tmp_path), "--sample_every", "4")
+    assert result.returncode == 2
+    assert "--sample_every needs --engine api or numpy" in result.stderr
+
+def test_scenedetect_output_commands_rejected_in_watch_mode(tmp_path):
+    for command in ("split-video", "save-images"):
+        result = run_script("--watch", str(tmp_path), "--", "detect-content", command)
+        assert result.returncode == 2
+        assert f"{command} cannot be combined with --watch" in result.stderr
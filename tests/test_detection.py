@@ -0,0 +1,78 @@
+import pytest
+
+from edius_core import detection
+from edius_core.detection import _proxy_size, refine_cuts, scenes_from_adaptive, scenes_from_fades, scenes_from_scores, timecode_to_frames
+
+def score_data(scores, start_frame=0, fps=25.0):
+    return {"fps": fps, "start_frame": start_frame, "end_frame": start_frame + len(scores), "scores": scores}
+
+def bounds(clips):
+    return [(clip["start"], clip["end"]) for clip in clips]
+
+def test_proxy_size_follows_the_width():
+    assert _proxy_size(1920, 1080, {}) == (256, 144)
+    # Portrait video: about 256 pixels wide as well, not 256 pixels high
+    assert _proxy_size(1080, 1920, {}) == (256, 455)
+    assert _proxy_size(200, 400, {}) == (200, 400)
+    assert _proxy_size(1920, 1080, {"downscale": "4"}) == (480, 270)
+
+@pytest.mark.parametrize("value, fps, frames", [
+    ("15", 25, 15),
+    ("2s", 25, 50),
+    ("2.4", 25, 60),
+    ("00:01:02", 25, 1550),
+    ("00:00:01.5", 50, 75),
+    ("1s", 30000 / 1001, 30),
+])
+def test_timecode_to_frames(value, fps, frames):
+    assert timecode_to_frames(value, fps) == frames
+
+def test_scenes_from_scores_cuts_at_every_frame_over_the_threshold():
+    scores = [0.0, 1, 1, 40, 1, 1, 1, 35, 1, 1]
+    assert bounds(scenes_from_scores(score_data(scores), 27)) == [(0, 3), (3, 7), (7, 10)]
+    # The frame numbers follow start_frame, and unscored (sampled out) frames are skipped
+    scores[3] = None
+    assert bounds(scenes_from_scores(score_data(scores, start_frame=100), 27)) == [(100, 107), (107, 110)]
+
+def test_scenes_from_scores_min_scene_len_drops_a_flash():
+    scores = [0.0] * 20
+    scores[6] = scores[8] = 50.0
+    assert bounds(scenes_from_scores(score_data(scores), 27, min_scene_len=5)) == [(0, 6), (6, 20)]
+
+def test_scenes_from_scores_without_cuts_is_one_scene():
+    assert bounds(scenes_from_scores(score_data([0.0] * 5), 27)) == [(0, 5)]
+
+def test_scenes_from_fades_cuts_halfway_through_the_dark_frames():
+    intensities = [100.0] * 10 + [0.0] * 4 + [100.0] * 6
+    assert bounds(scenes_from_fades(score_data(intensities), 12)) == [(0, 12), (12, 20)]
+    # fade_bias 1.0 moves the cut to the fade in
+    assert bounds(scenes_from_fades(score_data(intensities), 12, fade_bias=1.0)) == [(0, 14), (14, 20)]
+
+def test_scenes_from_adaptive_ignores_a_uniformly_busy_shot():
+    scores = [2.0] * 20
+    scores[10] = 40.0
+    assert bounds(scenes_from_adaptive(score_data(scores), 3.0, 15.0, 2)) == [(0, 10), (10, 20)]
+    # A fast camera move raises every score, so the same peak is no cut
+    busy = [30.0] * 20
+    busy[10] = 40.0
+    assert bounds(scenes_from_adaptive(score_data(busy), 3.0, 15.0, 2)) == [(0, 20)]
+
+def test_refine_cuts_moves_a_sampled_cut_to_the_exact_frame(monkeypatch):
+    windows = []
+
+    def fake_scores(video_file, settings):
+        # The real scene change is at frame 6; the cut was found on the sampled frame 8
+        first, end = int(settings["start"]), int(settings["end"])
+        windows.append((first, end))
+        return score_data([50.0 if frame == 6 else 1.0 for frame in range(first, end)], start_frame=first)
+
+    monkeypatch.setattr(detection, "compute_frame_scores_numpy", fake_scores)
+    clips = [{"id": "1", "start": 0, "end": 8}, {"id": "2", "start": 8, "end": 20}]
+    assert bounds(refine_cuts("video.mp4", clips, {"frame_skip": "3"}, "numpy")) == [(0, 6), (6, 20)]
+    # Only the frames skipped before the cut are decoded
+    assert windows == [(4, 9)]
+
+def test_refine_cuts_without_frame_skip_decodes_nothing(monkeypatch):
+    monkeypatch.setattr(detection, "compute_frame_scores_numpy", None)
+    clips = [{"id": "1", "start": 0, "end": 8}, {"id": "2", "start": 8, "end": 20}]
+    assert bounds(refine_cuts("video.mp4", clips, {}, "numpy")) == [(0, 8), (8, 20)]
@@ -0,0 +1,73 @@
+import math
+import re
+
+from edius_core.images import _select_expression, scene_image_frames
+
+def parse(expression):
+    # The subset of ffmpeg's expression syntax _select_expression writes, as nested tuples
+    tokens = re.findall(r"\d+|\w+|[(),]", expression)
+    position = 0
+
+    def node():
+        nonlocal position
+        token = tokens[position]
+        position += 1
+        if token.isdigit():
+            return int(token)
+        if token == "n":
+            return "n"
+        assert tokens[position] == "("
+        position += 1
+        args = [node()]
+        while tokens[position] == ",":
+            position += 1
+            args.append(node())
+        assert tokens[position] == ")"
+        position += 1
+        return (token, *args)
+
+    tree = node()
+    assert position == len(tokens)
+    return tree
+
+def evaluate(tree, n):
+    # Lazy like ffmpeg's if(): only the taken branch is evaluated
+    if tree == "n":
+        return n
+    if isinstance(tree, int):
+        return tree
+    name, *args = tree
+    if name == "if":
+        return evaluate(args[1], n) if evaluate(args[0], n) else evaluate(args[2], n)
+    values = [evaluate(arg, n) for arg in args]
+    if name == "eq":
+        return int(values[0] == values[1])
+    if name == "lt":
+        return int(values[0] < values[1])
+    if name == "between":
+        return int(values[1] <= values[0] <= values[2])
+    raise AssertionError(name)
+
+def depth(tree):
+    return 1 + max((depth(arg) for arg in tree[1:]), default=0) if isinstance(tree, tuple) else 0
+
+def test_select_expression_with_thousands_of_scenes():
+    # Scenes of 3 to 40 frames, some of them one frame long
+    clips = []
+    start = 0
+    for scene in range(5000):
+        end = start + (1 if scene % 97 == 0 else 3 + scene * 7 % 38)
+        clips.append({"start": start, "end": end})
+        start = end
+    wanted = sorted(scene_image_frames(clips))
+    tree = parse(_select_expression(wanted))
+
+    # Nested about log2(scenes) deep, not one level per frame
+    assert depth(tree) <= 2 * math.ceil(math.log2(len(wanted))) + 2
+    wanted_set = set(wanted)
+    for n in range(start + 5):
+        assert evaluate(tree, n) == (n in wanted_set), n
+
+def test_select_expression_single_frame():
+    assert _select_expression([7]) == "eq(n,7)"
+    assert _select_expression([7, 8, 9]) == "between(n,7,9)"
@@ -0,0 +1,26 @@
+import os
+import time
+
+def test_replaced_file_waits_for_its_running_job(cmd_module, tmp_path):
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"first")
+    other = tmp_path / "b.mp4"
+    other.write_bytes(b"other")
+    connection = cmd_module._open_job_db(str(tmp_path))
+    try:
+        cmd_module.scan_watch_dir(connection, str(tmp_path), settle=0)
+        first = cmd_module.next_watch_jobs(connection, set(), 1)
+        assert first == [str(video)]
+        with connection:
+            connection.execute("UPDATE jobs SET status = 'running' WHERE path = ?", (first[0],))
+
+        # Replaced while its job runs: queued again, but not handed out a second time
+        video.write_bytes(b"replaced, longer")
+        os.utime(video, ns=(time.time_ns(), time.time_ns() + 10**9))
+        cmd_module.scan_watch_dir(connection, str(tmp_path), settle=0)
+        assert cmd_module.next_watch_jobs(connection, {str(video)}, 2) == [str(other)]
+
+        # Once the first job is finished, the new version is picked up
+        assert str(video) in cmd_module.next_watch_jobs(connection, set(), 2)
+    finally:
+        connection.close()